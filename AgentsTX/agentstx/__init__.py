@@ -0,0 +1,3 @@
+"""
+Briques partagées par les pipelines AgentsTX (installées dans l'image pipelines, cf. pipelines/Dockerfile).
+"""
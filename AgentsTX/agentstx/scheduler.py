@@ -0,0 +1,245 @@
+"""
+Ordonnanceur partagé (à l'échelle du processus) pour tous les appels LLM des pipelines.
+
+Chaque modèle a sa propre file : une limite de concurrence, un token bucket (requêtes par minute)
+et une file de priorité. Les tours de chat interactifs passent avant l'analyse de documents,
+qui passe avant le trafic d'évaluation / de test de charge.
+
+    llm = get_scheduler().wrap(ChatOllama(...), model="qwq:32b", priority="interactive")
+    llm.with_structured_output(KW).invoke(messages)  # attend un créneau avant l'appel
+"""
+
+from typing import Any, Dict, Iterator, List, Literal, Optional
+import contextlib, contextvars, heapq, itertools, json, logging, threading, time, pydantic
+
+logger = logging.getLogger(__name__)
+
+Priority = Literal["interactive", "bulk", "eval"]
+PRIORITY_RANK: Dict[str, int] = {"interactive": 0, "bulk": 1, "eval": 2}
+
+_priority_override: contextvars.ContextVar[Optional[Priority]] = contextvars.ContextVar(
+    "llm_priority_override", default=None
+)
+
+
+@contextlib.contextmanager
+def priority(value: Priority) -> Iterator[None]:
+    """
+    Force la priorité de tous les appels LLM faits dans ce contexte
+    (par exemple "eval" pour le trafic généré par les tests de charge).
+    """
+    token = _priority_override.set(value)
+    try:
+        yield
+    finally:
+        _priority_override.reset(token)
+
+
+# =================================================================== LIMITS
+
+
+class ModelLimits(pydantic.BaseModel):
+    max_concurrency: int = pydantic.Field(default=2, ge=1, description="Appels simultanés max (cf. MAX_ASYNC de Lightrag).")
+    requests_per_minute: float = pydantic.Field(default=60.0, gt=0, description="Débit de remplissage du token bucket.")
+    burst: int = pydantic.Field(default=2, ge=1, description="Capacité du token bucket.")
+
+
+def parse_limits(raw: str) -> Dict[str, ModelLimits]:
+    """
+    Lit une valve / variable d'environnement JSON de la forme
+    {"qwq:32b": {"max_concurrency": 2, "requests_per_minute": 30}, "*": {...}}.
+    """
+    if not raw.strip():
+        return {}
+    return {model: ModelLimits(**limits) for model, limits in json.loads(raw).items()}
+
+
+class LaneMetrics(pydantic.BaseModel):
+    queue_depth: Dict[str, int] = pydantic.Field(..., description="Appels en attente par priorité.")
+    max_queue_depth: int
+    in_flight: int
+    served: Dict[str, int]
+    mean_wait: Dict[str, float] = pydantic.Field(..., description="Attente moyenne (s) par priorité.")
+
+
+class _Lane:
+    """File d'un modèle : concurrence + token bucket + file de priorité (FIFO à priorité égale)."""
+
+    def __init__(self, limits: ModelLimits):
+        self.limits = limits
+        self.cond = threading.Condition()
+        self.tokens = float(limits.burst)
+        self.refilled_at = time.monotonic()
+        self.in_flight = 0
+        self.waiting: List[tuple] = []  # heap de (rang de priorité, numéro d'arrivée)
+        self.counter = itertools.count()
+        self.max_queue_depth = 0
+        self.served = {p: 0 for p in PRIORITY_RANK}
+        self.total_wait = {p: 0.0 for p in PRIORITY_RANK}
+
+    def _refill(self, now: float):
+        rate = self.limits.requests_per_minute / 60
+        self.tokens = min(self.limits.burst, self.tokens + (now - self.refilled_at) * rate)
+        self.refilled_at = now
+
+    def acquire(self, priority: Priority, timeout: Optional[float] = None):
+        start = time.monotonic()
+        with self.cond:
+            ticket = (PRIORITY_RANK[priority], next(self.counter))
+            heapq.heappush(self.waiting, ticket)
+            self.max_queue_depth = max(self.max_queue_depth, len(self.waiting))
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if self.waiting[0] == ticket and self.in_flight < self.limits.max_concurrency:
+                        self._refill(now)
+                        if self.tokens >= 1:
+                            self.tokens -= 1
+                            self.in_flight += 1
+                            heapq.heappop(self.waiting)
+                            self.served[priority] += 1
+                            self.total_wait[priority] += now - start
+                            self.cond.notify_all()  # Le nouvel appel en tête de file peut prendre le créneau suivant
+                            return
+                        # Attendre le prochain jeton du bucket
+                        wait = (1 - self.tokens) * 60 / self.limits.requests_per_minute
+
+                    if timeout is not None:
+                        remaining = timeout - (now - start)
+                        if remaining <= 0:
+                            raise TimeoutError(f"Aucun créneau LLM disponible après {timeout}s (priorité {priority}).")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self.cond.wait(timeout=wait)
+            except BaseException:
+                if ticket in self.waiting:
+                    self.waiting.remove(ticket)
+                    heapq.heapify(self.waiting)
+                self.cond.notify_all()
+                raise
+
+    def release(self):
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def metrics(self) -> LaneMetrics:
+        with self.cond:
+            depth = {p: 0 for p in PRIORITY_RANK}
+            names = {rank: p for p, rank in PRIORITY_RANK.items()}
+            for rank, _ in self.waiting:
+                depth[names[rank]] += 1
+            return LaneMetrics(
+                queue_depth=depth,
+                max_queue_depth=self.max_queue_depth,
+                in_flight=self.in_flight,
+                served=dict(self.served),
+                mean_wait={p: self.total_wait[p] / self.served[p] if self.served[p] else 0.0 for p in PRIORITY_RANK},
+            )
+
+
+# =================================================================== SCHEDULER
+
+
+class LLMScheduler:
+
+    def __init__(self, limits: Optional[Dict[str, ModelLimits]] = None):
+        self._lock = threading.Lock()
+        self._limits: Dict[str, ModelLimits] = dict(limits or {})
+        self._lanes: Dict[str, _Lane] = {}
+
+    def configure(self, limits: Dict[str, ModelLimits]):
+        """
+        Met à jour les limites par modèle ("*" = limites par défaut).
+        Les files existantes appliquent les nouvelles limites immédiatement.
+        """
+        with self._lock:
+            self._limits.update(limits)
+            for model in list(self._lanes):
+                if self._lanes[model].limits != self._limits_for(model):
+                    lane = self._lanes[model]
+                    with lane.cond:
+                        lane.limits = self._limits_for(model)
+                        lane.tokens = min(lane.tokens, lane.limits.burst)
+                        lane.cond.notify_all()
+
+    def _limits_for(self, model: str) -> ModelLimits:
+        return self._limits.get(model) or self._limits.get("*") or ModelLimits()
+
+    def _lane(self, model: str) -> _Lane:
+        with self._lock:
+            if model not in self._lanes:
+                self._lanes[model] = _Lane(self._limits_for(model))
+            return self._lanes[model]
+
+    @contextlib.contextmanager
+    def slot(self, model: str, priority: Priority = "interactive", timeout: Optional[float] = None) -> Iterator[None]:
+        """Réserve un créneau d'appel pour `model` le temps du bloc."""
+        priority = _priority_override.get() or priority
+        lane = self._lane(model)
+        start = time.monotonic()
+        lane.acquire(priority, timeout)
+        waited = time.monotonic() - start
+        if waited > 1:
+            logger.info(f"Appel {model} ({priority}) en attente {waited:.1f}s, file : {lane.metrics().queue_depth}")
+        try:
+            yield
+        finally:
+            lane.release()
+
+    def metrics(self) -> Dict[str, LaneMetrics]:
+        with self._lock:
+            lanes = dict(self._lanes)
+        return {model: lane.metrics() for model, lane in lanes.items()}
+
+    def wrap(self, llm: Any, model: str, priority: Priority = "interactive") -> "ScheduledChatModel":
+        return ScheduledChatModel(llm, model, priority, self)
+
+
+class ScheduledChatModel:
+    """
+    Enveloppe un modèle de chat langchain : chaque invoke / stream attend un créneau du scheduler.
+    bind_tools et with_structured_output renvoient un modèle toujours ordonnancé.
+    """
+
+    def __init__(self, llm: Any, model: str, priority: Priority, scheduler: LLMScheduler):
+        self.llm = llm
+        self.model = model
+        self.priority = priority
+        self.scheduler = scheduler
+
+    def _wrap(self, llm: Any) -> "ScheduledChatModel":
+        return ScheduledChatModel(llm, self.model, self.priority, self.scheduler)
+
+    def bind_tools(self, *args, **kwargs) -> "ScheduledChatModel":
+        return self._wrap(self.llm.bind_tools(*args, **kwargs))
+
+    def with_structured_output(self, *args, **kwargs) -> "ScheduledChatModel":
+        return self._wrap(self.llm.with_structured_output(*args, **kwargs))
+
+    def invoke(self, *args, **kwargs) -> Any:
+        with self.scheduler.slot(self.model, self.priority):
+            return self.llm.invoke(*args, **kwargs)
+
+    def stream(self, *args, **kwargs) -> Iterator[Any]:
+        # Le créneau est tenu jusqu'à la fin (ou l'abandon) du stream
+        with self.scheduler.slot(self.model, self.priority):
+            yield from self.llm.stream(*args, **kwargs)
+
+
+_scheduler = LLMScheduler()
+
+
+def get_scheduler() -> LLMScheduler:
+    """Scheduler unique du processus, partagé par toutes les pipelines chargées."""
+    return _scheduler
+
+
+def reset_scheduler() -> LLMScheduler:
+    """
+    Remplace le scheduler du processus par un scheduler neuf (limites et métriques à zéro), par exemple entre
+    deux paliers d'un test de charge. Les appels déjà en file gardent l'ancien.
+    """
+    global _scheduler
+    _scheduler = LLMScheduler()
+    return _scheduler
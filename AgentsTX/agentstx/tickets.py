@@ -0,0 +1,367 @@
+"""
+Outbox persistante (SQLite) des tickets GLPI.
+
+La pipeline enregistre le ticket validé et répond tout de suite à l'utilisateur ; un worker en arrière-plan
+(un par processus, partagé par les pipelines rechargées) transmet les tickets à GLPI un par un,
+avec retries et backoff exponentiel. Un seul ticket est accepté par conversation.
+
+Chaque ticket est réservé ('sending') avant son envoi et porte la référence de sa conversation dans GLPI.
+Si le résultat d'un envoi est incertain (timeout, connexion coupée, erreur 5xx), le ticket est d'abord
+recherché dans GLPI par cette référence au lieu d'être renvoyé : pas de doublon si GLPI l'avait créé.
+
+    outbox = get_outbox("data/ticket_outbox.sqlite3")
+    outbox.enqueue(conversation_id, ticket.model_dump(mode="json"))        # immédiat, aucun appel réseau
+    start_worker(outbox, GLPIClient(url="https://glpi/apirest.php", app_token=..., user_token=...))
+"""
+
+from typing import Any, Dict, Iterator, List, Literal, Optional
+import contextlib, json, logging, pathlib, random, sqlite3, threading, time, pydantic
+
+logger = logging.getLogger(__name__)
+
+TicketStatus = Literal["pending", "sending", "sent", "failed"]
+REFERENCE_PREFIX = "tx-outbox-"
+
+
+# =================================================================== OUTBOX
+
+
+class OutboxTicket(pydantic.BaseModel):
+    id: int
+    conversation: str
+    ticket: Dict[str, Any]
+    status: TicketStatus
+    attempts: int = 0
+    glpi_id: Optional[int] = None
+    last_error: Optional[str] = None
+
+
+class TicketOutbox:
+    """
+    File de tickets dans une base SQLite (une connexion par appel : utilisable depuis tous les threads
+    du serveur de pipelines). La contrainte UNIQUE sur la conversation déduplique les envois.
+    Statut 'sending' : ticket réservé par un worker, ou dont le dernier envoi a peut-être abouti.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tickets (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    conversation TEXT NOT NULL UNIQUE,
+                    ticket TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt REAL NOT NULL,
+                    glpi_id INTEGER,
+                    last_error TEXT,
+                    created REAL NOT NULL,
+                    sent REAL
+                )
+                """
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS tickets_due ON tickets (status, next_attempt)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:  # Transaction : commit, ou rollback en cas d'exception
+                yield db
+        finally:
+            db.close()
+
+    def enqueue(self, conversation: str, ticket: Dict[str, Any]) -> bool:
+        """
+        Enregistre le ticket d'une conversation. False si cette conversation a déjà un ticket en attente ou envoyé ;
+        un ticket abandonné ('failed') est remplacé et repart de zéro.
+        """
+        now = time.time()
+        with self._connect() as db:
+            cursor = db.execute(
+                "INSERT INTO tickets (conversation, ticket, next_attempt, created) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (conversation) DO UPDATE SET ticket = excluded.ticket, status = 'pending', attempts = 0, "
+                "next_attempt = excluded.next_attempt, glpi_id = NULL, last_error = NULL, created = excluded.created, sent = NULL "
+                "WHERE tickets.status = 'failed'",
+                (conversation, json.dumps(ticket, ensure_ascii=False), now, now),
+            )
+            return cursor.rowcount == 1
+
+    def claim(self, limit: int, lease: float) -> List[OutboxTicket]:
+        """
+        Réserve les tickets à transmettre maintenant, les plus anciens d'abord : en attente dont le backoff est écoulé,
+        ou 'sending' dont la réservation a expiré (envoi incertain, worker arrêté en plein envoi).
+        Ils passent en 'sending' pour `lease` secondes ; le statut renvoyé est celui d'avant la réservation.
+        """
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")  # Deux workers (deux processus) ne réservent pas le même ticket
+            rows = db.execute(
+                "SELECT id, conversation, ticket, status, attempts, glpi_id, last_error FROM tickets "
+                "WHERE status IN ('pending', 'sending') AND next_attempt <= ? ORDER BY id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            db.executemany(
+                "UPDATE tickets SET status = 'sending', next_attempt = ? WHERE id = ?", [(now + lease, r[0]) for r in rows]
+            )
+        return [
+            OutboxTicket(id=r[0], conversation=r[1], ticket=json.loads(r[2]), status=r[3], attempts=r[4], glpi_id=r[5], last_error=r[6])
+            for r in rows
+        ]
+
+    def mark_sent(self, ticket_id: int, glpi_id: int):
+        with self._connect() as db:
+            db.execute(
+                "UPDATE tickets SET status = 'sent', glpi_id = ?, sent = ?, attempts = attempts + 1, last_error = NULL WHERE id = ?",
+                (glpi_id, time.time(), ticket_id),
+            )
+
+    def mark_retry(self, ticket_id: int, error: str, delay: float, max_attempts: int, uncertain: bool = False):
+        """
+        Replanifie le ticket dans `delay` secondes, ou l'abandonne ('failed') après `max_attempts` essais.
+        `uncertain` : GLPI a peut-être créé le ticket, il reste 'sending' pour être recherché avant d'être renvoyé.
+        """
+        with self._connect() as db:
+            db.execute(
+                "UPDATE tickets SET attempts = attempts + 1, last_error = ?, next_attempt = ?, "
+                "status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE ? END WHERE id = ?",
+                (error[:500], time.time() + delay, max_attempts, "sending" if uncertain else "pending", ticket_id),
+            )
+
+    def get(self, conversation: str) -> Optional[OutboxTicket]:
+        with self._connect() as db:
+            r = db.execute(
+                "SELECT id, conversation, ticket, status, attempts, glpi_id, last_error FROM tickets WHERE conversation = ?",
+                (conversation,),
+            ).fetchone()
+        if r is None:
+            return None
+        return OutboxTicket(id=r[0], conversation=r[1], ticket=json.loads(r[2]), status=r[3], attempts=r[4], glpi_id=r[5], last_error=r[6])
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as db:
+            return dict(db.execute("SELECT status, COUNT(*) FROM tickets GROUP BY status").fetchall())
+
+
+# =================================================================== GLPI
+
+
+def outbox_reference(conversation: str) -> str:
+    """Référence d'une conversation dans le contenu du ticket GLPI, pour le retrouver après un envoi incertain."""
+    return REFERENCE_PREFIX + conversation
+
+
+def glpi_ticket_input(ticket: Dict[str, Any], conversation: Optional[str] = None) -> Dict[str, Any]:
+    """Ticket de la pipeline (TicketReseau) => champs 'input' de l'API REST GLPI (itemtype Ticket)."""
+    text = lambda value: {True: "oui", False: "non"}.get(value, value) if isinstance(value, bool) else (
+        ", ".join(map(str, value)) if isinstance(value, list) else value
+    )
+    details = "\n".join(
+        f"{key.replace('_', ' ').capitalize()} : {text(value)}"
+        for key, value in ticket.items()
+        if key not in ("objet", "description") and value is not None
+    )
+    if conversation is not None:
+        details += f"\nRéférence : {outbox_reference(conversation)}"
+    return {
+        "name": ticket.get("objet", "Ticket assistant technique"),
+        "content": f"{ticket.get('description', '')}\n\n{details}",
+        "type": 1 if ticket.get("type_demande") == "incident" else 2,  # 1 = incident, 2 = demande
+    }
+
+
+def is_uncertain(error: Exception) -> bool:
+    """
+    Vrai si GLPI a pu traiter la requête malgré l'erreur (timeout, connexion coupée, réponse illisible, erreur 5xx).
+    Seule une réponse 4xx garantit que rien n'a été créé.
+    """
+    import urllib.error
+
+    return not (isinstance(error, urllib.error.HTTPError) and error.code < 500)
+
+
+class GLPIClient(pydantic.BaseModel):
+    """Client minimal de l'API REST GLPI (apirest.php) : session, création d'un ticket, recherche par référence."""
+    url: str = pydantic.Field(..., description="URL de l'API, ex: https://glpi.utc.fr/apirest.php")
+    app_token: str = ""
+    user_token: str = ""
+    timeout: float = 30.0
+
+    def _request(self, method: str, path: str, headers: Dict[str, str], body: Optional[Any] = None) -> Any:
+        import urllib.request  # Chargé par le worker seulement (import de la pipeline plus rapide)
+
+        request = urllib.request.Request(
+            self.url.rstrip("/") + path,
+            method=method,
+            data=json.dumps(body).encode("utf-8") if body is not None else None,
+            headers={"Content-Type": "application/json", **({"App-Token": self.app_token} if self.app_token else {}), **headers},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            content = response.read()
+        return json.loads(content) if content else None
+
+    @contextlib.contextmanager
+    def session(self) -> Iterator[str]:
+        """Jeton de session GLPI, fermée à la sortie."""
+        session = self._request("GET", "/initSession", {"Authorization": f"user_token {self.user_token}"})["session_token"]
+        try:
+            yield session
+        finally:
+            with contextlib.suppress(Exception):
+                self._request("GET", "/killSession", {"Session-Token": session})
+
+    def create_ticket(self, session: str, ticket: Dict[str, Any], conversation: str) -> Optional[int]:
+        """
+        Crée un ticket (un par requête : le résultat de chaque envoi est connu). Renvoie son identifiant GLPI,
+        None s'il est refusé. Lève une exception si GLPI est injoignable ou répond une erreur (cf. is_uncertain).
+        """
+        created = self._request("POST", "/Ticket", {"Session-Token": session}, {"input": glpi_ticket_input(ticket, conversation)})
+        return (created.get("id") or None) if isinstance(created, dict) else None
+
+    def find_ticket(self, session: str, conversation: str) -> Optional[int]:
+        """Identifiant du ticket GLPI qui porte la référence de la conversation (recherche dans la description), sinon None."""
+        import urllib.parse
+
+        query = urllib.parse.urlencode({
+            "criteria[0][field]": 21,  # Description
+            "criteria[0][searchtype]": "contains",
+            "criteria[0][value]": outbox_reference(conversation),
+            "forcedisplay[0]": 2,  # ID
+        })
+        found = self._request("GET", f"/search/Ticket?{query}", {"Session-Token": session}) or {}
+        ids = [row.get("2") for row in found.get("data") or [] if isinstance(row, dict)]
+        return next((int(i) for i in ids if i), None)
+
+
+# =================================================================== WORKER
+
+
+class OutboxWorker:
+    """Thread d'arrière-plan qui vide l'outbox vers GLPI, ticket par ticket, avec backoff exponentiel (+ jitter)."""
+
+    def __init__(
+        self,
+        outbox: TicketOutbox,
+        client: GLPIClient,
+        batch_size: int = 10,
+        interval: float = 5.0,
+        max_attempts: int = 10,
+        backoff: float = 10.0,
+        max_backoff: float = 3600.0,
+        lease: float = 600.0,
+    ):
+        self.outbox = outbox
+        self.client = client
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lease = lease  # Durée de réservation d'un lot, au-delà du temps de son envoi
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def delay(self, attempts: int) -> float:
+        """Délai avant le prochain essai d'un ticket qui a déjà échoué `attempts` fois (attempts >= 1)."""
+        return min(self.max_backoff, self.backoff * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+
+    def _retry(self, item: OutboxTicket, error: str, uncertain: bool):
+        self.outbox.mark_retry(item.id, error, self.delay(item.attempts + 1), self.max_attempts, uncertain)
+
+    def _send(self, session: str, item: OutboxTicket) -> bool:
+        """Transmet un ticket réservé. S'il était 'sending', un envoi précédent a peut-être abouti : on le cherche d'abord."""
+        uncertain = item.status == "sending"
+        try:
+            glpi_id = self.client.find_ticket(session, item.conversation) if uncertain else None
+            uncertain = False
+            if glpi_id is None:
+                glpi_id = self.client.create_ticket(session, item.ticket, item.conversation)
+        except Exception as e:
+            uncertain = uncertain or is_uncertain(e)
+            logger.warning(f"Envoi du ticket {item.id} à GLPI échoué{' (résultat incertain)' if uncertain else ''} : {type(e).__name__}: {e}")
+            self._retry(item, f"{type(e).__name__}: {e}", uncertain)
+            return False
+        if glpi_id is None:
+            self._retry(item, "Refusé par GLPI", uncertain=False)
+            return False
+        self.outbox.mark_sent(item.id, glpi_id)
+        return True
+
+    def flush(self) -> int:
+        """Réserve et transmet un lot de tickets dus, dans une même session GLPI. Renvoie le nombre de tickets réservés."""
+        batch = self.outbox.claim(self.batch_size, self.lease)
+        remaining = list(batch)
+        try:
+            if batch:
+                with self.client.session() as session:
+                    while remaining:
+                        self._send(session, remaining[0])
+                        remaining.pop(0)
+        except Exception as e:  # Session impossible : rien n'a été envoyé pour les tickets restants
+            logger.warning(f"Session GLPI impossible, {len(remaining)} ticket(s) replanifié(s) : {type(e).__name__}: {e}")
+            for item in remaining:
+                self._retry(item, f"{type(e).__name__}: {e}", uncertain=item.status == "sending")
+        return len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                while self.flush() == self.batch_size and not self._stop.is_set():
+                    pass  # Lot plein : il en reste probablement d'autres
+            except Exception as e:  # Base verrouillée, etc. : le worker ne doit jamais mourir
+                logger.exception(f"Worker de tickets : {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def wake(self):
+        """Demande un envoi sans attendre la fin de l'intervalle (après un enqueue)."""
+        self._wake.set()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="glpi-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+_lock = threading.Lock()
+_outboxes: Dict[str, TicketOutbox] = {}
+_workers: Dict[str, OutboxWorker] = {}
+
+
+def get_outbox(path: str) -> TicketOutbox:
+    """Outbox unique par fichier dans le processus."""
+    with _lock:
+        if path not in _outboxes:
+            _outboxes[path] = TicketOutbox(path)
+        return _outboxes[path]
+
+
+def start_worker(outbox: TicketOutbox, client: GLPIClient, **options) -> OutboxWorker:
+    """
+    Démarre le worker de l'outbox, ou met à jour son client GLPI s'il tourne déjà
+    (les pipelines rechargées ou aux valves modifiées ne lancent pas de second worker).
+    """
+    with _lock:
+        worker = _workers.get(outbox.path)
+        if worker is None:
+            worker = _workers[outbox.path] = OutboxWorker(outbox, client, **options)
+        worker.client = client
+        worker.start()
+        return worker
+
+
+def get_worker(outbox: TicketOutbox) -> Optional[OutboxWorker]:
+    with _lock:
+        return _workers.get(outbox.path)
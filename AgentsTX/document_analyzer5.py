@@ -11,16 +11,20 @@ requirements: tiktoken
 from typing import (
     List, Dict, Union, 
     Generator, Iterator, Literal,
-    TypedDict, Coroutine, Dict, Optional
+    TypedDict, Coroutine, Dict, Optional,
+    TYPE_CHECKING,
 )
 from langchain_core.messages import AIMessage, SystemMessage, AIMessageChunk
 
-import re, os, pydantic, tiktoken, asyncio, json
+import re, os, pydantic, asyncio, json, functools
 from collections import defaultdict
-from raphlib import tool
-from langchain_openai import ChatOpenAI
-from langchain_ollama import ChatOllama
 from langchain_core.messages import SystemMessage, AIMessage, HumanMessage, ToolMessage
+from agentstx.scheduler import Priority, ScheduledChatModel, get_scheduler, parse_limits
+
+# Imports lourds différés (tiktoken, langchain_openai, raphlib) : ils sont chargés au premier usage,
+# pour que le rechargement des pipelines (et le mode w84_docs) restent rapides.
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
 
 # =================================================================== UTILITIES
 
@@ -47,8 +51,24 @@ def extract_source_contexts(content: str) -> Dict[int, str]:
     
     return result
 
+@functools.cache
+def _encoding():
+    import tiktoken
+    return tiktoken.get_encoding("cl100k_base")
+
 def count_tokens(text: str) -> int:
-    return len(tiktoken.get_encoding("cl100k_base").encode(text))
+    return len(_encoding().encode(text))
+
+@functools.lru_cache(maxsize=8)
+def _openai_client(model: str, base_url: str, api_key: str) -> "ChatOpenAI":
+    """Un client par (modèle, endpoint, clé), réutilisé entre les requêtes."""
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        api_key = api_key, 
+        base_url = base_url,
+        model = model,
+        temperature = 0.0,
+    )
                 
 # =================================================================== PROMPTS
 
@@ -137,11 +157,29 @@ class Pipeline:
         TOKEN_LIMIT_CHAT: str = ""
         MODEL_NAME_ANALYZE: str = ""
         MODEL_NAME_CHAT: str = ""
+        LLM_LIMITS: str = ""  # JSON {"modele": {"max_concurrency": 2, "requests_per_minute": 60}}
 
     def __init__(self):
         self.name = "Analyse de Documents"
         self.valves = self.Valves(**{key: os.getenv(key, "") for key in self.Valves.model_fields.keys()})
 
+    def chat_model(self, model: str) -> "ChatOpenAI":
+        """
+        Client LLM utilisé pour tous les appels de la pipeline.
+        Peut être remplacé (par exemple par un modèle factice pour les tests de charge).
+        """
+        return _openai_client(model, self.valves.UTC_ENDPOINT, self.valves.UTC_API_KEY)
+
+    def llm(self, model: str, priority: Priority) -> ScheduledChatModel:
+        """Client LLM dont les appels passent par le scheduler partagé du processus."""
+        return get_scheduler().wrap(self.chat_model(model), model, priority)
+
+    async def on_startup(self):
+        await self.on_valves_updated()
+
+    async def on_valves_updated(self):
+        get_scheduler().configure(parse_limits(self.valves.LLM_LIMITS))
+
     def pipe(
         self, user_message: str, model_id: str, messages: List[Dict[str, str]], body: dict
     ) -> Union[str, Generator, Iterator]:
@@ -191,12 +229,7 @@ class Pipeline:
                     
                 # III ============================ Initialisation de la conversation
             
-                chat_llm = ChatOpenAI(
-                        api_key = self.valves.UTC_API_KEY, 
-                        base_url = self.valves.UTC_ENDPOINT,
-                        model = self.valves.MODEL_NAME_CHAT,
-                        temperature = 0.0,
-                    )
+                chat_llm = self.llm(self.valves.MODEL_NAME_CHAT, "interactive")
             
                 if MODE == "w84_docs":
                     
@@ -210,6 +243,8 @@ class Pipeline:
                     
                     print("Mode questions")
                 
+                    from raphlib import tool
+
                     class AnalyzeDocumentsInput(pydantic.BaseModel):
                         information_request: str = pydantic.Field(..., description="Un prompt qui explique les informations demandées en précisant leur format / unité / métrique pour chaque type d'information dès que possible.")
                     @tool
@@ -257,12 +292,7 @@ class Pipeline:
                             
                             yield {"event":{"type":"status","data":{"description":"Analyse des Documents","done": False}}}
                         
-                            analyzer_llm = ChatOpenAI(
-                                api_key = self.valves.UTC_API_KEY, 
-                                base_url = self.valves.UTC_ENDPOINT,
-                                model = self.valves.MODEL_NAME_ANALYZE,
-                                temperature = 0.0,
-                            )
+                            analyzer_llm = self.llm(self.valves.MODEL_NAME_ANALYZE, "bulk")
                         
                             # queries: List[Coroutine[AIMessage]] = [
                             #     analyzer_llm.ainvoke([SystemMessage(
@@ -9,6 +9,7 @@ requirements: tiktoken
 """
 
 from typing import (
+    TYPE_CHECKING,
     List,
     Union,
     Generator,
@@ -25,13 +26,21 @@ from langchain_core.messages import (
     HumanMessage,
     AIMessageChunk,
 )
-from raphlib import tool
 
-import os, pydantic, tiktoken
-from langchain_ollama import ChatOllama
+import os, functools, hashlib, json, pydantic
+from agentstx.scheduler import Priority, ScheduledChatModel, get_scheduler, parse_limits
+from agentstx.tickets import GLPIClient, TicketOutbox, get_outbox, get_worker, start_worker
+from inferers.keyword_graph import KeywordGraph
+from inferers.keyword_ids import vocabulary_for
+from inferers.packing import DEFAULT_TOKEN_BUDGET, pack, rank_by_keywords
 
 import logging
 
+# Imports lourds différés (tiktoken, langchain_ollama, raphlib) : ils sont chargés au premier usage,
+# pour que le rechargement des pipelines reste rapide.
+if TYPE_CHECKING:
+    from langchain_ollama import ChatOllama
+
 logging.basicConfig(level=logging.INFO)
 
 # =================================================================== TYPING
@@ -158,6 +167,13 @@ BDD = {
     },
 }
 
+
+@functools.cache
+def keyword_graph() -> KeywordGraph:
+    """Graphe de co-occurrence des mots clés de BDD, construit au premier usage."""
+    return KeywordGraph.build(BDD["documents"])
+
+
 # =================================================================== TICKET
 
 # --- Literals pour les champs avec des choix limités ---
@@ -241,11 +257,63 @@ class TicketReseau(pydantic.BaseModel):
     )
 
 
+# --- Envoi du ticket ---
+
+# Dossier de données explicite (à monter sur un volume persistant), indépendant du répertoire courant du serveur
+DATA_DIR = os.getenv("TX_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_OUTBOX_PATH = os.path.join(DATA_DIR, "ticket_outbox.sqlite3")
+
+
+def parse_ticket(content: str) -> TicketReseau:
+    """Relit le ticket proposé par l'assistant ('[TICKET] {...}\n\nRépondez "envoyer" ...')."""
+    data, _ = json.JSONDecoder().raw_decode(content.strip().removeprefix("[TICKET]").strip())
+    return TicketReseau(**data)
+
+
+def conversation_id(body: dict, messages: List[PipeMessageInput]) -> str:
+    """
+    Identifiant de la conversation OpenWebUI (chat_id), sinon empreinte de l'utilisateur et de tout l'historique
+    jusqu'au ticket proposé : deux conversations qui commencent pareil ("Bonjour") ne se confondent pas,
+    mais un même "envoyer" rejoué donne le même identifiant.
+    """
+    chat_id = body.get("chat_id") or (body.get("metadata") or {}).get("chat_id")
+    if chat_id:
+        return str(chat_id)
+    user = (body.get("user") or {}).get("id", "")
+    history = json.dumps([[message["role"], message["content"]] for message in messages[:-1]], ensure_ascii=False)
+    return hashlib.sha1(f"{user}\n{history}".encode("utf-8")).hexdigest()
+
+
 # =================================================================== COUNT TOKENS
 
 
+@functools.cache
+def _encoding():
+    import tiktoken
+
+    return tiktoken.get_encoding("cl100k_base")
+
+
 def count_tokens(text: str) -> int:
-    return len(tiktoken.get_encoding("cl100k_base").encode(text))
+    return len(_encoding().encode(text))
+
+
+# =================================================================== LLM CLIENTS
+
+
+@functools.lru_cache(maxsize=8)
+def _ollama_client(model: str, base_url: str, api_key: str) -> "ChatOllama":
+    """Un client par (modèle, endpoint, clé), réutilisé entre les requêtes."""
+    from langchain_ollama import ChatOllama
+
+    return ChatOllama(
+        client_kwargs={  # Sera utilisé pour httpx.Client et httpx.AsyncClient
+            "headers": {"Authorization": f"Bearer {api_key}"}
+        },
+        base_url=base_url,
+        model=model,
+        temperature=0.0,
+    )
 
 
 # =================================================================== PIPELINE
@@ -259,6 +327,13 @@ class Pipeline:
         MODEL_NAME_CHAT: str = ""
         TOKEN_LIMIT_CHAT: str = ""
         MODEL_NAME_ANALYZE: str = ""
+        LLM_LIMITS: str = ""  # JSON {"modele": {"max_concurrency": 2, "requests_per_minute": 60}}
+        TOKEN_BUDGET_KNOWLEDGE: str = ""  # Tokens max de Knowledge dans le prompt (défaut : DEFAULT_TOKEN_BUDGET)
+        GLPI_URL: str = ""  # API REST GLPI (https://.../apirest.php), vide = tickets gardés dans l'outbox
+        GLPI_APP_TOKEN: str = ""
+        GLPI_USER_TOKEN: str = ""
+        TICKET_OUTBOX_PATH: str = ""  # Base SQLite de l'outbox (défaut : DEFAULT_OUTBOX_PATH)
+        KEYWORD_EXPANSION: str = ""  # Poids minimal des arêtes de co-occurrence suivies (ex: 0.5), vide = pas d'expansion
 
     def __init__(self):
         self.name = "Assistant Technique Expérimental"
@@ -266,6 +341,20 @@ class Pipeline:
             **{key: os.getenv(key, "") for key in self.Valves.model_fields.keys()}
         )
 
+    def chat_model(self, model: str) -> "ChatOllama":
+        """
+        Client LLM utilisé pour tous les appels de la pipeline.
+        Peut être remplacé (par exemple par un modèle factice pour les tests de charge).
+        """
+        return _ollama_client(model, self.valves.UTC_ENDPOINT, self.valves.UTC_API_KEY)
+
+    def llm(self, model: str, priority: Priority) -> ScheduledChatModel:
+        """Client LLM dont les appels passent par le scheduler partagé du processus."""
+        return get_scheduler().wrap(self.chat_model(model), model, priority)
+
+    def outbox(self) -> TicketOutbox:
+        return get_outbox(self.valves.TICKET_OUTBOX_PATH or DEFAULT_OUTBOX_PATH)
+
     async def on_startup(self):
         await self.on_valves_updated()
 
@@ -273,7 +362,12 @@ class Pipeline:
         """
         Redefine the graph and tools using the updated values.
         """
-        pass
+        get_scheduler().configure(parse_limits(self.valves.LLM_LIMITS))
+        if self.valves.GLPI_URL:  # Worker d'envoi des tickets, unique dans le processus
+            start_worker(
+                self.outbox(),
+                GLPIClient(url=self.valves.GLPI_URL, app_token=self.valves.GLPI_APP_TOKEN, user_token=self.valves.GLPI_USER_TOKEN),
+            )
 
     def pipe(
         self,
@@ -296,7 +390,19 @@ class Pipeline:
                     "[TICKET]"
                 ):
                     if user["content"].lower() == "envoyer":
-                        return "Le ticket a été envoyé!"
+                        # Le ticket est enregistré dans l'outbox et transmis à GLPI en arrière-plan
+                        try:
+                            ticket = parse_ticket(ai["content"])
+                        except (ValueError, pydantic.ValidationError):
+                            return "Le ticket n'a pas pu être relu. Demandez à l'assistant de le proposer à nouveau."
+                        outbox = self.outbox()
+                        if not outbox.enqueue(conversation_id(body, messages), ticket.model_dump(mode="json")):
+                            return "Un ticket est déjà enregistré pour cette conversation."
+                        worker = get_worker(outbox)
+                        if worker is None:  # Valve GLPI_URL vide : aucun envoi tant qu'elle n'est pas renseignée
+                            return "Le ticket a été enregistré, mais l'envoi vers GLPI n'est pas activé pour le moment."
+                        worker.wake()
+                        return "Le ticket a été enregistré et sera transmis au support informatique."
                     else:
                         messages.append(
                             {
@@ -325,41 +431,41 @@ class Pipeline:
 
             # 2. Trouver des chunks pertinents
 
-            class KW(pydantic.BaseModel):
-                keywords: List[str]
-
+            vocabulary = vocabulary_for(BDD["keywords"].keys())
             kw = (
-                ChatOllama(
-                    client_kwargs={  # Sera utilisé pour httpx.Client et httpx.AsyncClient
-                        "headers": {
-                            "Authorization": f"Bearer {self.valves.UTC_API_KEY}"
-                        }
-                    },
-                    base_url=self.valves.UTC_ENDPOINT,
-                    model=self.valves.MODEL_NAME_ANALYZE,
-                    temperature=0.0,
-                )
-                .with_structured_output(KW)
+                self.llm(self.valves.MODEL_NAME_ANALYZE, "interactive")
+                .with_structured_output(vocabulary.json_schema())
                 .invoke(
                     [
                         SystemMessage(
                             content="Sélectionne tous les mots clés qui correspondent à peu près à la situation de l'utilisateur d'après la conversation."
                             + "\nSi l'utilisateur n'est pas en train de parler d'un problème (par exemple il créé un ticket), ne choisit aucun mot clé."
-                            + "\nSélectionne uniquement les mots clés parmi la liste suivante:"
-                            + str(list(BDD["keywords"].keys()))
+                            + "\nRéponds avec les numéros des mots clés choisis, uniquement parmi la liste suivante (numéro mot-clé):\n"
+                            + vocabulary.prompt()
                         )
                     ]
                     + CONVERSATION
                 )
             )
-            chunks = set()
-            for k in kw.keywords:
-                chunks.update(
-                    [doc for doc, keywords in BDD["documents"].items() if k in keywords]
-                )
+            keywords = vocabulary.resolve_output(kw)
+            expansion = None
+            if self.valves.KEYWORD_EXPANSION:  # Mots clés voisins (un saut), récupérés dès ce tour
+                expansion = keyword_graph().expand(keywords, min_weight=float(self.valves.KEYWORD_EXPANSION))
+            knowledge = pack(
+                rank_by_keywords(BDD["documents"], keywords, expansion),
+                budget=int(self.valves.TOKEN_BUDGET_KNOWLEDGE or DEFAULT_TOKEN_BUDGET),
+                count_tokens=count_tokens,
+            )
+            logging.info(
+                f"Knowledge : {len(knowledge.chunks)}/{knowledge.candidates} chunks, "
+                f"{knowledge.tokens}/{knowledge.budget} tokens "
+                f"({knowledge.duplicates} doublons, {knowledge.over_budget} hors budget)"
+            )
 
             # 3. Répondre en utilisant les chunks
 
+            from raphlib import tool
+
             @tool
             def create_ticket(
                 inp: TicketReseau,
@@ -380,18 +486,13 @@ class Pipeline:
                     
                     Voici quelques sujets reçus usuellement par la DSI.\n\n1. Authentification et accès  \n   Mots-clés/phrases :  \n     • “mot de passe oublié” / “login refusé” / “identifiants invalides”  \n     • “accès refusé” / “permission denied”  \n     • “blocage compte” / “verrouillage session”  \n   Thématiques RAG suggérées :  \n     – Gestion des mots de passe (changement, recommandations ANSSI)  \n     – Déclaration et gestion des comptes UTC  \n     – Récupération et réinitialisation d’identifiants  \n\n2. Réseau et connectivité  \n   Mots-clés/phrases :  \n     • “pas d’internet” / “aucun réseau” / “déconnecté”  \n     • “Wi-Fi ne s’affiche pas” / “connexion eduroam”  \n     • “VPN ne démarre pas” / “erreur OpenVPN / GlobalProtect”  \n   Thématiques RAG suggérées :  \n     – VPN, Wi-Fi et filaire (profils, ports, SSID)  \n     – Dépannage réseau de base (DNS, MAC, DHCP)  \n     – Configuration manuelle de DNS  \n\n3. Partages et stockage  \n   Mots-clés/phrases :  \n     • “lecteur réseau inaccessible” / “montage SMB échoue”  \n     • “SFTP / FileZilla” / “téléversement impossible”  \n     • “droits écriture/lecture”  \n   Thématiques RAG suggérées :  \n     – Accès aux fichiers et lecteurs réseau (SMB, SFTP)  \n     – Activation du service SSH/SFTP  \n     – Gestionnaire d’identification Windows  \n\n4. Messagerie  \n   Mots-clés/phrases :  \n     • “envoi mail échoue” / “SMTP error”  \n     • “réception bloquée” / “IMAP timeout”  \n     • “redirection mail” / “forward étudiant”  \n   Thématiques RAG suggérées :  \n     – Configuration de la messagerie (IMAP/SMTP, Exchange)  \n     – Webmail via ENT  \n     – Redirection des mails étudiants  \n\n5. Imprimantes et périphériques  \n   Mots-clés/phrases :  \n     • “imprimante non trouvée” / “erreur spooler”  \n     • “connexion USB/ réseau”  \n     • “driver manquant”  \n   Thématiques RAG suggérées :  \n     – Mise à jour des mots de passe d’imprimante (Gestionnaire d’identification)  \n     – Installation et partage d’imprimantes sur Windows  \n     – Dépannage spooler  \n\n6. Performance et lenteur  \n   Mots-clés/phrases :  \n     • “ordinateur lent” / “démarrage trop long”  \n     • “applications réagissent mal”  \n     • “goulot d’étranglement réseau”  \n   Thématiques RAG suggérées :  \n     – Agents de sécurité et inventaire (OCS, Cortex XDR)  \n     – Analyse de charge réseau / débogage DNS  \n     – Vérification des services et mises à jour  \n\n7. Sécurité et antivirus  \n   Mots-clés/phrases :  \n     • “alerte virus” / “malware detecté”  \n     • “pare-feu bloque”  \n     • “posture VPN”  \n   Thématiques RAG suggérées :  \n     – Installation et configuration de Cortex XDR  \n     – GlobalProtect : posture et remontées  \n     – Bonnes pratiques de sécurité  \n\n8. Téléphonie et messagerie vocale  \n   Mots-clés/phrases :  \n     • “pas de tonalité” / “pas d’appel”  \n     • “renvoi d’appel” / “messagerie vocale”  \n     • “conférence à 3” / “parking d’appel”  \n   Thématiques RAG suggérées :  \n     – Guide Téléphonie IP (codes fonctions, conf call)  \n     – Numérotation internes/externe  \n     – Paramètres code de sécurité et messagerie  \n\nChaque fois qu’une plainte ou un mot-clé est détecté, le système RAG peut renvoyer :  \n • Le document ou la section précise à consulter  \n • Un diagnostic automatisé (checklist de vérifications)  \n • Des FAQ ou didacticiels associés  \n • Des liens vers les guides de l’ENT ou le portail 5000.
                     
-                    Knowledge: \n{chunks}"""
+                    Knowledge: \n{knowledge.render()}"""
                 )
             ]
 
-            LLM = ChatOllama(
-                client_kwargs={  # Sera utilisé pour httpx.Client et httpx.AsyncClient
-                    "headers": {"Authorization": f"Bearer {self.valves.UTC_API_KEY}"}
-                },
-                base_url=self.valves.UTC_ENDPOINT,
-                model=self.valves.MODEL_NAME_CHAT,
-                temperature=0.0,
-            ).bind_tools([create_ticket])
+            LLM = self.llm(self.valves.MODEL_NAME_CHAT, "interactive").bind_tools(
+                [create_ticket]
+            )
 
             def stream():
                 # TODO : Intégrer tiktoken ici
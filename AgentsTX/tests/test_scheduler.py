@@ -0,0 +1,36 @@
+import threading, time
+import pydantic, pytest
+
+from agentstx.scheduler import LLMScheduler, ModelLimits
+
+
+def test_rate_limited_waiters_are_woken_without_a_release():
+    """
+    Quand le token bucket limite, chaque acquisition doit réveiller l'appel suivant de la file :
+    C démarre au jeton suivant (~0.2 s), sans attendre la fin de l'appel de A (1 s).
+    """
+    scheduler = LLMScheduler({"m": ModelLimits(max_concurrency=3, requests_per_minute=600, burst=1)})
+    origin = time.monotonic()
+    started = {}
+
+    def call(name: str):
+        with scheduler.slot("m"):
+            started[name] = time.monotonic() - origin
+            time.sleep(1.0)
+
+    threads = []
+    for name in "ABC":
+        threads.append(threading.Thread(target=call, args=(name,)))
+        threads[-1].start()
+        time.sleep(0.01)  # Ordre d'arrivée A, B, C
+    for thread in threads:
+        thread.join()
+
+    assert started["A"] < 0.05
+    assert started["C"] < 0.6, started
+    assert scheduler.metrics()["m"].served["interactive"] == 3
+
+
+def test_limits_reject_zero_rate():
+    with pytest.raises(pydantic.ValidationError):
+        ModelLimits(requests_per_minute=0)
@@ -0,0 +1,6 @@
+"""
+Garde-fous de performance des pipelines et des modules d'inférence.
+
+    python -m bench.importtime     # temps d'import (cold start) et imports lourds interdits
+    python -m bench.micro run      # microbenchmarks des chemins chauds, comparés à une baseline JSON
+"""
@@ -0,0 +1,106 @@
+"""
+Mesure le coût d'import (cold start) des pipelines et des modules d'inférence avec `python -X importtime`,
+et échoue si un budget est dépassé ou si un import lourd est chargé dès l'import du module.
+
+    python -m bench.importtime [--repeat 3] [--scale 1.0]
+"""
+
+from typing import Dict, List, Tuple
+import argparse, os, pathlib, re, subprocess, sys, pydantic
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+EVALUATION_DIR = ROOT / "TXEvaluation"
+
+HEAVY_IMPORTS = ["tiktoken", "langchain_openai", "langchain_ollama", "raphlib"]
+
+
+class ImportBudget(pydantic.BaseModel):
+    target: str = pydantic.Field(..., description="Fichier .py (relatif à la racine du dépôt) ou module importable depuis TXEvaluation.")
+    budget_ms: float
+    forbidden: List[str] = HEAVY_IMPORTS
+
+
+BUDGETS: List[ImportBudget] = [
+    ImportBudget(target="AgentsTX/rag_test4.py", budget_ms=500),
+    ImportBudget(target="AgentsTX/document_analyzer5.py", budget_ms=500),
+    ImportBudget(target="rag.keywords_inference", budget_ms=500),
+    ImportBudget(target="rag.vector_inference", budget_ms=700),
+]
+
+
+class ImportProfile(pydantic.BaseModel):
+    total_ms: float
+    modules: Dict[str, float] = pydantic.Field(..., description="Module de premier niveau => temps cumulé (ms).")
+    imported: List[str] = pydantic.Field(..., description="Tous les modules importés, y compris indirectement.")
+
+
+def _import_code(target: str) -> str:
+    if target.endswith(".py"):
+        path = ROOT / target
+        return (
+            "import importlib.util, sys\n"
+            f"sys.path.insert(0, {str(path.parent)!r})\n"
+            f"spec = importlib.util.spec_from_file_location({path.stem!r}, {str(path)!r})\n"
+            "spec.loader.exec_module(importlib.util.module_from_spec(spec))\n"
+        )
+    return f"import {target}\n"
+
+
+def profile_import(target: str) -> ImportProfile:
+    """Importe la cible dans un interpréteur neuf et agrège la sortie de -X importtime."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(ROOT / "TXRAG"), os.environ.get("PYTHONPATH", "")]))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _import_code(target)],
+        cwd=EVALUATION_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Import de {target} impossible :\n{result.stderr[-2000:]}")
+
+    total_us, modules, imported = 0, {}, []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)", line)
+        if match:
+            self_us, cumulative_us, indent, name = int(match[1]), int(match[2]), match[3], match[4]
+            total_us += self_us
+            imported.append(name)
+            if indent == "":
+                modules[name] = cumulative_us / 1000
+    return ImportProfile(total_ms=total_us / 1000, modules=modules, imported=imported)
+
+
+def check(budget: ImportBudget, repeat: int = 3, scale: float = 1.0) -> Tuple[bool, str]:
+    # Le premier import compile les .pyc : on garde la meilleure des mesures
+    profile = min((profile_import(budget.target) for _ in range(repeat)), key=lambda p: p.total_ms)
+    heavy = sorted({
+        name.split(".")[0] for name in profile.imported
+        if any(name == f or name.startswith(f + ".") for f in budget.forbidden)
+    })
+    slowest = sorted(profile.modules.items(), key=lambda kv: -kv[1])[:5]
+    ok = profile.total_ms <= budget.budget_ms * scale and not heavy
+    report = (
+        f"{'OK ' if ok else 'KO '} {budget.target}: {profile.total_ms:.0f} ms / budget {budget.budget_ms * scale:.0f} ms"
+        + (f" | imports lourds chargés à l'import : {', '.join(heavy)}" if heavy else "")
+        + "\n      " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in slowest)
+    )
+    return ok, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Budget de temps d'import des pipelines et modules d'inférence")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplie les budgets (machines lentes, CI)")
+    parser.add_argument("targets", nargs="*", help="Cibles à vérifier (défaut : toutes)")
+    args = parser.parse_args()
+
+    failed = False
+    for budget in BUDGETS:
+        if args.targets and budget.target not in args.targets:
+            continue
+        ok, report = check(budget, args.repeat, args.scale)
+        print(report)
+        failed |= not ok
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
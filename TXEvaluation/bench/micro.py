@@ -0,0 +1,220 @@
+"""
+Microbenchmarks des chemins chauds locaux (Python pur) exécutés à chaque requête des pipelines :
+recherche par mots clés, extraction des sources uploadées, comptage de tokens, construction des prompts
+et chargement de l'index. Les entrées sont synthétiques, de la taille actuelle jusqu'à 100k documents
+et des uploads de plusieurs Mo, pour détecter les problèmes de passage à l'échelle.
+
+    python -m bench.micro run [--quick] [--output bench/baselines/micro.json] [--compare]
+    python -m bench.micro compare resultats.json [--baseline bench/baselines/micro.json] [--threshold 0.25]
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import argparse, datetime, gc, json, pathlib, platform, random, statistics, sys, timeit, pydantic
+
+from loadtest.runner import load_pipeline_module  # Charge les pipelines comme le serveur (et met AgentsTX / TXRAG dans sys.path)
+from inferers.json_db import JSONKeywordDB
+from inferers.packing import pack, rank_by_keywords
+from loaders.synthetic_index import generate
+
+BASELINE_PATH = pathlib.Path(__file__).resolve().parent / "baselines" / "micro.json"
+
+# Tailles actuelles (index de rag_test4 : 12 documents, 24 mots clés) jusqu'aux tailles cibles
+DOCUMENTS = [12, 1_000, 10_000, 100_000]
+UPLOAD_BYTES = [10_000, 1_000_000, 4_000_000]
+CONVERSATION_MESSAGES = [4, 50, 500]
+QUICK = {"documents": DOCUMENTS[:2], "upload_bytes": UPLOAD_BYTES[:1], "messages": CONVERSATION_MESSAGES[:2]}
+
+
+# =================================================================== SYNTHETIC INPUTS
+
+WORDS = (
+    "réseau wifi eduroam connexion imprimante ticket mot passe messagerie serveur vpn bureau salle "
+    "utilisateur poste portable câble adresse erreur accès compte étudiant enseignant lecteur partage"
+).split()
+
+
+def synthetic_upload(n_bytes: int, n_sources: int = 5, seed: int = 0) -> str:
+    """Message système OpenWebUI avec des fichiers glissés dans le chat, ~n_bytes au total."""
+    rng = random.Random(seed)
+    per_source = n_bytes // n_sources
+    sources = []
+    for i in range(n_sources):
+        words: List[str] = []
+        size = 0
+        while size < per_source:
+            words.append(rng.choice(WORDS))
+            size += len(words[-1]) + 1
+        sources.append(f'<source id="{i + 1}" name="document_{i + 1}.txt">{" ".join(words)}</source>')
+    return "\n".join(sources)
+
+
+def synthetic_conversation(n_messages: int, seed: int = 0) -> List[Dict[str, str]]:
+    rng = random.Random(seed)
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": " ".join(rng.choices(WORDS, k=50))}
+        for i in range(n_messages)
+    ]
+
+
+# =================================================================== BENCHMARKS
+
+
+class Benchmark(pydantic.BaseModel):
+    name: str = pydantic.Field(..., description="Chemin mesuré et taille de l'entrée, ex: json_db.get/documents=1000.")
+    best: Optional[float] = pydantic.Field(default=None, description="Meilleur temps par appel (s), None si ignoré.")
+    median: Optional[float] = None
+    loops: int = 0
+    skipped: Optional[str] = None
+
+
+def cases(quick: bool = False) -> Iterator[Tuple[str, Callable[[], Any]]]:
+    """(nom, appel à mesurer). Les entrées sont construites avant la mesure."""
+    sizes = QUICK if quick else {"documents": DOCUMENTS, "upload_bytes": UPLOAD_BYTES, "messages": CONVERSATION_MESSAGES}
+    analyzer = load_pipeline_module("document_analyzer5")
+
+    for n in sizes["documents"]:
+        index = generate(n, n_keywords=200, n_queries=0, zipf=0).index()  # Mots clés uniformes
+        raw = json.dumps(index, ensure_ascii=False)
+        db = JSONKeywordDB(**index)
+        selected = list(index["keywords"])[:3]
+        yield f"index.load/documents={n}", lambda raw=raw: JSONKeywordDB(**json.loads(raw))
+        yield f"json_db.get/documents={n}", lambda db=db, selected=selected: db.get(selected)
+        # Scan des mots clés fait à chaque tour par rag_test4, puis empaquetage dans le budget
+        # (le coût du tokenizer est mesuré à part par count_tokens)
+        yield f"rank_by_keywords/documents={n}", lambda db=db, selected=selected: rank_by_keywords(db.documents, selected)
+        candidates = rank_by_keywords(db.documents, selected)
+        yield f"pack/documents={n}", lambda candidates=candidates: pack(candidates)
+
+    for n in sizes["upload_bytes"]:
+        upload = synthetic_upload(n)
+        yield f"extract_source_contexts/bytes={n}", lambda upload=upload: analyzer.extract_source_contexts(upload)
+        yield f"count_tokens/bytes={n}", lambda upload=upload: analyzer.count_tokens(upload)
+
+    for n in sizes["messages"]:
+        conversation = synthetic_conversation(n)
+        yield f"make_prompt/messages={n}", lambda conversation=conversation: analyzer.make_prompt(
+            "w84_questions", conversation, n_uploaded_documents=3
+        )
+
+
+def measure(function: Callable[[], Any], repeat: int = 5) -> Tuple[float, float, int]:
+    """(meilleur, médian, boucles) par appel, à la manière de timeit : au moins ~0.2 s par mesure."""
+    timer = timeit.Timer(function)
+    loops, _ = timer.autorange()
+    times = [t / loops for t in timer.repeat(repeat=repeat, number=loops)]
+    return min(times), statistics.median(times), loops
+
+
+def run(quick: bool = False, repeat: int = 5, only: Optional[List[str]] = None) -> List[Benchmark]:
+    results = []
+    for name, function in cases(quick):
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        try:
+            function()  # Échauffement (caches, imports paresseux), et vérifie que le chemin est disponible
+        except Exception as e:  # ex: encodage tiktoken non téléchargeable hors-ligne
+            results.append(Benchmark(name=name, skipped=f"{type(e).__name__}: {e}"[:200]))
+            print(f"{name:45} ignoré ({type(e).__name__})")
+            continue
+        best, median, loops = measure(function, repeat)
+        results.append(Benchmark(name=name, best=best, median=median, loops=loops))
+        print(f"{name:45} {best * 1e3:10.3f} ms  (médiane {median * 1e3:.3f} ms, {loops} boucles)")
+        gc.collect()
+    return results
+
+
+# =================================================================== BASELINES
+
+
+class Baseline(pydantic.BaseModel):
+    created: str
+    python: str
+    machine: str
+    benchmarks: Dict[str, Benchmark]
+
+    @classmethod
+    def of(cls, results: List[Benchmark]) -> "Baseline":
+        return cls(
+            created=datetime.datetime.now().isoformat(timespec="seconds"),
+            python=platform.python_version(),
+            machine=f"{platform.system()} {platform.machine()} {platform.processor()}".strip(),
+            benchmarks={result.name: result for result in results},
+        )
+
+    def save(self, path: pathlib.Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.model_dump_json(indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> "Baseline":
+        return cls.model_validate_json(path.read_text(encoding="utf-8"))
+
+
+def compare(baseline: Baseline, current: Baseline, threshold: float = 0.25) -> Tuple[bool, List[str]]:
+    """
+    Compare les meilleurs temps : une régression est un ralentissement de plus de `threshold`
+    (0.25 = +25%). Une mesure de la baseline qui échoue maintenant (ignorée) est aussi un échec ;
+    les mesures absentes d'un des deux fichiers, ou ignorées dans la baseline, sont signalées sans échouer.
+    """
+    ok, lines = True, []
+    for name in sorted(set(baseline.benchmarks) | set(current.benchmarks), key=_natural_key):
+        before, after = baseline.benchmarks.get(name), current.benchmarks.get(name)
+        if before is not None and before.best is not None and after is not None and after.skipped:
+            ok = False
+            lines.append(f"KO {name:45} {before.best * 1e3:10.3f} ms -> ignoré ({after.skipped})")
+            continue
+        if before is None or after is None or before.best is None or after.best is None:
+            lines.append(f"   {name:45} non comparable")
+            continue
+        ratio = after.best / before.best
+        regression = ratio > 1 + threshold
+        ok &= not regression
+        lines.append(
+            f"{'KO ' if regression else 'OK '}{name:45} {before.best * 1e3:10.3f} ms -> {after.best * 1e3:10.3f} ms  x{ratio:.2f}"
+        )
+    return ok, lines
+
+
+def _natural_key(name: str) -> Tuple[str, int]:
+    path, _, size = name.partition("=")
+    return path, int(size) if size.isdigit() else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks des chemins chauds des pipelines")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Mesure et enregistre les résultats (JSON)")
+    run_parser.add_argument("--quick", action="store_true", help="Petites tailles seulement (CI)")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--output", default=None, help="Fichier JSON, ex: bench/baselines/micro.json")
+    run_parser.add_argument("--compare", nargs="?", const=str(BASELINE_PATH), default=None, help="Baseline à comparer aux résultats de ce run")
+    run_parser.add_argument("--threshold", type=float, default=0.25)
+    run_parser.add_argument("only", nargs="*", help="Préfixes des benchmarks à lancer (défaut : tous)")
+
+    compare_parser = commands.add_parser("compare", help="Compare deux fichiers de résultats")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    compare_parser.add_argument("--threshold", type=float, default=0.25, help="Ralentissement toléré (0.25 = +25%%)")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        current = Baseline.of(run(args.quick, args.repeat, args.only))
+        if args.output:
+            current.save(pathlib.Path(args.output))
+            skipped = [benchmark.name for benchmark in current.benchmarks.values() if benchmark.skipped]
+            if skipped:  # Ces chemins ne seront jamais comparés à cette baseline
+                print(f"Attention : {len(skipped)} benchmark(s) ignoré(s) dans {args.output} : {', '.join(skipped)}")
+        if not args.compare:
+            return
+        baseline = Baseline.load(pathlib.Path(args.compare))
+    else:
+        baseline, current = Baseline.load(pathlib.Path(args.baseline)), Baseline.load(pathlib.Path(args.current))
+
+    ok, lines = compare(baseline, current, args.threshold)
+    print("\n".join(lines))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Passage à l'échelle des retrievers sur des index synthétiques (loaders.synthetic_index) :
+temps de construction, mémoire retenue par l'index, latence de recherche et rappel des réponses attendues.
+
+    python -m bench.retrieval [--documents 1000 10000 100000] [--backends keywords graph vector] [--output scaling.json]
+
+Le retriever par mots clés reçoit la sélection oracle des questions (pas d'appel LLM) : son rappel mesure
+l'index, pas la sélection des mots clés.
+"""
+
+from typing import Callable, Dict, List
+import argparse, json, time, tracemalloc, pydantic
+
+from loadtest.runner import Percentiles  # Met aussi TXRAG dans sys.path
+from inferers.json_db import JSONKeywordDB
+from inferers.keyword_graph import KeywordGraph
+from inferers.packing import rank_by_keywords
+from inferers.vector_db import HashEmbedder, VectorDB
+from loaders.synthetic_index import SyntheticCorpus, generate
+
+Retriever = Callable[[str, List[str], int], List[str]]  # (question, mots clés oracle, k) => documents
+
+
+def keywords_backend(corpus: SyntheticCorpus) -> Retriever:
+    db = JSONKeywordDB(**corpus.index())
+
+    def retrieve(question: str, keywords: List[str], k: int) -> List[str]:
+        candidates = sorted(rank_by_keywords(db.documents, keywords), key=lambda c: -c.score)
+        return [candidate.text for candidate in candidates[:k]]
+
+    return retrieve
+
+
+def graph_backend(corpus: SyntheticCorpus) -> Retriever:
+    """Mots clés oracle étendus à un saut dans le graphe de co-occurrence (construit avec l'index)."""
+    db = JSONKeywordDB(**corpus.index())
+    graph = KeywordGraph.build(db.documents)
+
+    def retrieve(question: str, keywords: List[str], k: int) -> List[str]:
+        candidates = sorted(rank_by_keywords(db.documents, keywords, graph.expand(keywords)), key=lambda c: -c.score)
+        return [candidate.text for candidate in candidates[:k]]
+
+    return retrieve
+
+
+def vector_backend(corpus: SyntheticCorpus) -> Retriever:
+    db = VectorDB.build(list(corpus.documents), HashEmbedder())
+    return lambda question, keywords, k: db.get(question, k)
+
+
+BACKENDS: Dict[str, Callable[[SyntheticCorpus], Retriever]] = {
+    "keywords": keywords_backend,
+    "graph": graph_backend,
+    "vector": vector_backend,
+}
+
+
+class ScalingResult(pydantic.BaseModel):
+    backend: str
+    documents: int
+    queries: int
+    build_s: float
+    memory_mib: float = pydantic.Field(..., description="Mémoire allouée par la construction et encore retenue (tracemalloc).")
+    latency_ms: Percentiles
+    recall: float = pydantic.Field(..., description="Part des réponses attendues présentes dans les k documents récupérés.")
+
+
+def measure(backend: str, corpus: SyntheticCorpus, k: int = 8) -> ScalingResult:
+    tracemalloc.start()
+    start = time.perf_counter()
+    retrieve = BACKENDS[backend](corpus)
+    build_s = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies, found, expected = [], 0, 0
+    for question, answers in corpus.truth.items():
+        start = time.perf_counter()
+        documents = retrieve(question, corpus.queries[question], k)
+        latencies.append((time.perf_counter() - start) * 1e3)
+        context = "\n".join(documents)
+        found += sum(answer in context for answer in answers)
+        expected += len(answers)
+
+    return ScalingResult(
+        backend=backend,
+        documents=len(corpus.documents),
+        queries=len(corpus.truth),
+        build_s=build_s,
+        memory_mib=memory / 2**20,
+        latency_ms=Percentiles.of(latencies),
+        recall=found / expected if expected else 0.0,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence, mémoire et rappel des retrievers sur des index synthétiques")
+    parser.add_argument("--documents", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--keywords", type=int, default=2000, help="Taille du vocabulaire de mots clés")
+    parser.add_argument("--keywords-per-document", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS.keys(), default=list(BACKENDS))
+    parser.add_argument("--k", type=int, default=8, help="Documents récupérés par question")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Fichier JSON où enregistrer les résultats")
+    args = parser.parse_args()
+
+    results: List[ScalingResult] = []
+    print(f"{'retriever':10} {'documents':>9} {'construction':>12} {'mémoire':>10} {'p50':>9} {'p95':>9} {'rappel':>7}")
+    for n in args.documents:
+        corpus = generate(n, args.keywords, args.keywords_per_document, args.queries, seed=args.seed)
+        for backend in args.backends:
+            result = measure(backend, corpus, args.k)
+            results.append(result)
+            print(
+                f"{backend:10} {n:>9} {result.build_s:>11.2f}s {result.memory_mib:>7.1f} Mo "
+                f"{result.latency_ms.p50:>6.2f} ms {result.latency_ms.p95:>6.2f} ms {result.recall:>7.2f}"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump([result.model_dump() for result in results], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+"""
+Tests de charge hors-ligne des pipelines AgentsTX (rag_test4, document_analyzer5).
+
+    python -m loadtest --pipeline rag_test4 --rate 1 2 4 --concurrency 4
+"""
+
+from .stub import StubChatModel, StubLatency
+from .workload import PipeRequest, make_requests
+from .runner import LoadReport, load_pipeline_module, make_stub_pipeline, run_load
@@ -0,0 +1,65 @@
+"""
+Balaye plusieurs débits d'arrivée contre une pipeline et affiche / sauvegarde les rapports.
+
+    python -m loadtest --pipeline document_analyzer5 --documents 3 --rate 0.5 1 2 --concurrency 8 --memory
+"""
+
+import argparse, json
+
+from .stub import StubLatency
+from .workload import make_requests
+from .runner import UNLIMITED, load_pipeline_module, make_stub_pipeline, run_load
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge hors-ligne de Pipeline.pipe()")
+    parser.add_argument("--pipeline", default="rag_test4", help="Nom du fichier de pipeline dans AgentsTX (sans .py)")
+    parser.add_argument("--requests", type=int, default=50, help="Nombre de requêtes par palier")
+    parser.add_argument("--rate", type=float, nargs="*", default=[], help="Débits d'arrivée à balayer (req/s). Vide = toutes à t=0")
+    parser.add_argument("--concurrency", type=int, default=4, help="Taille du pool de workers")
+    parser.add_argument("--max-queue", type=int, default=None, help="Nombre max de requêtes en attente avant refus")
+    parser.add_argument("--documents", type=int, default=0, help="Documents synthétiques joints à chaque conversation")
+    parser.add_argument("--document-words", type=int, default=2000, help="Taille de chaque document synthétique (mots)")
+    parser.add_argument("--ttft", type=float, default=0.3, help="Latence du modèle factice avant le premier token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0, help="Débit de génération du modèle factice")
+    parser.add_argument("--response-tokens", type=int, default=120, help="Tokens générés par réponse du modèle factice")
+    parser.add_argument("--tool-call-rate", type=float, default=0.5, help="Probabilité de tool call quand des tools sont fournis")
+    parser.add_argument("--llm-limits", default=UNLIMITED, help="Valve LLM_LIMITS (JSON) pour reproduire les limites du scheduler")
+    parser.add_argument("--memory", action="store_true", help="Mesurer la mémoire par session (tracemalloc, plus lent)")
+    parser.add_argument("--output", default=None, help="Fichier JSON où enregistrer les rapports")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    module = load_pipeline_module(args.pipeline)
+    latency = StubLatency(ttft=args.ttft, tokens_per_second=args.tokens_per_second, response_tokens=args.response_tokens)
+
+    reports = []
+    for rate in args.rate or [None]:
+        pipeline = make_stub_pipeline(
+            module, latency, tool_call_rate=args.tool_call_rate, llm_limits=args.llm_limits, seed=args.seed,
+        )
+        requests = make_requests(
+            args.requests, args.pipeline,
+            n_documents=args.documents, document_words=args.document_words, seed=args.seed,
+        )
+        report = run_load(
+            pipeline, requests, args.pipeline, rate, args.concurrency,
+            max_queue=args.max_queue, trace_memory=args.memory, seed=args.seed,
+        )
+        reports.append(report)
+        print(
+            f"rate={rate or 'burst':>6} | {report.throughput:6.2f} req/s | "
+            f"queue p95={report.queue_delay.p95:6.2f}s | ttft p95={report.ttft.p95:6.2f}s | "
+            f"latency p95={report.latency.p95:6.2f}s p99={report.latency.p99:6.2f}s | "
+            f"errors={report.errors} rejected={report.rejected} max_queue={report.max_queue_depth}"
+            + (f" | {report.memory_per_session_kib:.0f} KiB/session" if report.memory_per_session_kib is not None else "")
+            + (" | SATURÉ" if report.saturated else "")
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump([r.model_dump() for r in reports], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Serveur GLPI factice (API REST apirest.php : initSession, killSession, création et recherche de Ticket),
+avec latence, taux de pannes et taux de réponses perdues réglables, pour tester l'outbox de tickets sans vrai GLPI.
+Une réponse perdue coupe la connexion après la création du ticket (cas d'un timeout côté client).
+
+    python -m loadtest.mock_glpi --port 8089 --latency 2 --failure-rate 0.3 --lost-reply-rate 0.2
+    # puis valve GLPI_URL = http://localhost:8089/apirest.php
+"""
+
+from typing import Any, Dict, List, Optional
+import argparse, json, random, threading, time, urllib.parse, uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockGLPI:
+
+    def __init__(self, port: int = 0, latency: float = 0.0, failure_rate: float = 0.0, lost_reply_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.lost_reply_rate = lost_reply_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tickets: List[Dict[str, Any]] = []
+        self.requests = 0
+        self.sessions: set = set()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/apirest.php"
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        glpi = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def _reply(self, status: int, body: Any):
+                content = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def _fail(self) -> bool:
+                """Latence simulée, puis panne aléatoire (503) selon failure_rate."""
+                time.sleep(glpi.latency)
+                with glpi.lock:
+                    glpi.requests += 1
+                    failed = glpi.rng.random() < glpi.failure_rate
+                if failed:
+                    self._reply(503, ["ERROR", "GLPI factice indisponible"])
+                return failed
+
+            def do_GET(self):
+                if self._fail():
+                    return
+                if self.path.endswith("/initSession"):
+                    if not self.headers.get("Authorization", "").startswith("user_token"):
+                        return self._reply(401, ["ERROR_LOGIN_PARAMETERS_MISSING", ""])
+                    session = uuid.uuid4().hex
+                    with glpi.lock:
+                        glpi.sessions.add(session)
+                    return self._reply(200, {"session_token": session})
+                if self.path.endswith("/killSession"):
+                    with glpi.lock:
+                        glpi.sessions.discard(self.headers.get("Session-Token"))
+                    return self._reply(200, None)
+                path, _, query = self.path.partition("?")
+                if path.rstrip("/").endswith("/search/Ticket"):
+                    # Seul critère géré : description (champ 21) qui contient la valeur ; colonne ID (champ 2)
+                    value = urllib.parse.parse_qs(query).get("criteria[0][value]", [""])[0]
+                    with glpi.lock:
+                        if self.headers.get("Session-Token") not in glpi.sessions:
+                            return self._reply(401, ["ERROR_SESSION_TOKEN_INVALID", ""])
+                        rows = [{"2": i + 1} for i, t in enumerate(glpi.tickets) if value and value in t.get("content", "")]
+                    return self._reply(200, {"totalcount": len(rows), "count": len(rows), "data": rows})
+                self._reply(400, ["ERROR_RESOURCE_NOT_FOUND_NOR_COMMONDBTM", ""])
+
+            def do_POST(self):
+                if self._fail():
+                    return
+                if not self.path.rstrip("/").endswith("/Ticket"):
+                    return self._reply(400, ["ERROR_RESOURCE_NOT_FOUND_NOR_COMMONDBTM", ""])
+                with glpi.lock:
+                    if self.headers.get("Session-Token") not in glpi.sessions:
+                        return self._reply(401, ["ERROR_SESSION_TOKEN_INVALID", ""])
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                inputs = payload.get("input", [])
+                created = []
+                with glpi.lock:
+                    for ticket in inputs if isinstance(inputs, list) else [inputs]:
+                        if not ticket.get("name"):
+                            created.append({"id": False, "message": "Champ name obligatoire"})
+                            continue
+                        glpi.tickets.append(ticket)
+                        created.append({"id": len(glpi.tickets), "message": ""})
+                    lost = glpi.rng.random() < glpi.lost_reply_rate
+                if lost:  # Tickets créés, mais le client ne reçoit pas de réponse
+                    self.close_connection = True
+                    return
+                self._reply(201, created if isinstance(inputs, list) else created[0])
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "MockGLPI":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-glpi", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur GLPI factice pour l'outbox de tickets")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latence de chaque appel (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probabilité d'une réponse 503")
+    parser.add_argument("--lost-reply-rate", type=float, default=0.0, help="Probabilité qu'une création aboutisse sans réponse")
+    args = parser.parse_args()
+
+    glpi = MockGLPI(args.port, args.latency, args.failure_rate, args.lost_reply_rate)
+    print(f"GLPI factice sur {glpi.url}")
+    try:
+        glpi.server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"{len(glpi.tickets)} ticket(s) reçus, {glpi.requests} requêtes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Exécution d'un test de charge : arrivées à débit configurable (processus de Poisson),
+pool de workers de taille fixe (comme le threadpool du serveur de pipelines) et collecte des métriques.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+from types import ModuleType
+import asyncio, importlib.util, pathlib, random, sys, threading, time, tracemalloc, pydantic
+from concurrent.futures import ThreadPoolExecutor
+
+from .stub import StubChatModel, StubLatency
+from .workload import PipeRequest
+
+PIPELINES_DIR = pathlib.Path(__file__).resolve().parents[2] / "AgentsTX"
+RAG_DIR = pathlib.Path(__file__).resolve().parents[2] / "TXRAG"
+for directory in (PIPELINES_DIR, RAG_DIR):  # Paquets agentstx et inferers, installés dans l'image pipelines
+    if str(directory) not in sys.path:
+        sys.path.insert(0, str(directory))
+
+from agentstx.scheduler import get_scheduler, priority, reset_scheduler
+UNLIMITED = '{"*": {"max_concurrency": 1000000, "requests_per_minute": 1e12, "burst": 1000000}}'
+PIPELINE_ERROR = "<class '"  # Préfixe des exceptions formatées "{type(e)} {e}" par les pipelines
+
+
+# =================================================================== PIPELINE LOADING
+
+
+def load_pipeline_module(name: str, directory: pathlib.Path = PIPELINES_DIR) -> ModuleType:
+    """Charge un fichier de pipeline comme le fait le serveur de pipelines (import par chemin)."""
+    spec = importlib.util.spec_from_file_location(name, directory / f"{name}.py")
+    if spec is None or spec.loader is None:
+        raise FileNotFoundError(f"Pipeline introuvable : {directory / f'{name}.py'}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_stub_pipeline(
+    module: ModuleType,
+    latency: StubLatency,
+    tool_call_rate: float = 0.0,
+    llm_limits: str = UNLIMITED,
+    seed: int = 0,
+) -> Any:
+    """
+    Instancie module.Pipeline avec des valves de test et le modèle factice à la place du LLM.
+    `llm_limits` est passé à la valve LLM_LIMITS (par défaut le scheduler ne limite pas le modèle factice).
+    Le scheduler du processus est remis à zéro : les métriques du rapport ne portent que sur ce palier.
+    """
+    rng = random.Random(seed)
+    structured: Dict[str, Callable] = {}
+    if hasattr(module, "BDD"):
+        n_keywords = len(module.BDD["keywords"])  # Sortie en identifiants de mots clés (cf. inferers.keyword_ids)
+        structured["KW"] = lambda messages: {"keywords": rng.sample(range(n_keywords), k=rng.randint(1, 3))}
+
+    stub = StubChatModel(
+        latency=latency,
+        structured=structured,
+        tool_args={
+            "analyze_documents": {"information_request": "Trouve le titre et le sujet principal du document."},
+            "create_ticket": {
+                "personne_concernee": "Jean Dupont",
+                "objet": "Problème connexion Wifi bureau B134",
+                "type_demande": "incident",
+                "site": "CR",
+                "numero_bureau_salle": "CR B134",
+                "departement": "Génie Informatique",
+                "telephone": "4567",
+                "materiel_declare": True,
+                "type_reseau": "Wifi",
+                "description": "Le portable ne se connecte pas à eduroam.",
+            },
+        },
+        tool_call_rate=tool_call_rate,
+        seed=seed,
+    )
+
+    try:
+        module.count_tokens("tokenizer")
+    except Exception as e:  # Encodage tiktoken non disponible hors-ligne (cf. TIKTOKEN_CACHE_DIR)
+        print(f"Tokenizer indisponible ({type(e).__name__}), approximation à 4 caractères par token.")
+        module.count_tokens = lambda text: len(text) // 4
+
+    reset_scheduler()
+    pipeline = module.Pipeline()
+    pipeline.valves = pipeline.Valves(**{
+        key: ("1000000" if key.startswith("TOKEN_LIMIT") else "loadtest")
+        for key in pipeline.Valves.model_fields.keys()
+        if key.startswith(("TOKEN_LIMIT", "UTC_", "MODEL_NAME"))
+    })  # Les autres valves gardent leur valeur par défaut
+    if "LLM_LIMITS" in pipeline.Valves.model_fields:
+        pipeline.valves.LLM_LIMITS = llm_limits
+    pipeline.chat_model = lambda model: stub
+    if hasattr(pipeline, "on_startup"):
+        asyncio.run(pipeline.on_startup())
+    return pipeline
+
+
+# =================================================================== METRICS
+
+
+class RequestTiming(pydantic.BaseModel):
+    arrival: float
+    start: Optional[float] = None
+    first_token: Optional[float] = None
+    end: Optional[float] = None
+    error: Optional[str] = None
+    rejected: bool = False
+
+
+class Percentiles(pydantic.BaseModel):
+    mean: float = 0.0
+    p50: float = 0.0
+    p95: float = 0.0
+    p99: float = 0.0
+
+    @classmethod
+    def of(cls, values: List[float]) -> "Percentiles":
+        if not values:
+            return cls()
+        values = sorted(values)
+        rank = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+        return cls(mean=sum(values) / len(values), p50=rank(0.50), p95=rank(0.95), p99=rank(0.99))
+
+
+class LoadReport(pydantic.BaseModel):
+    pipeline: str
+    rate: Optional[float] = pydantic.Field(..., description="Débit d'arrivée visé (req/s), None = toutes les requêtes à t=0.")
+    concurrency: int
+    requests: int
+    completed: int
+    errors: int
+    rejected: int
+    duration: float
+    throughput: float = pydantic.Field(..., description="Requêtes terminées par seconde.")
+    queue_delay: Percentiles
+    ttft: Percentiles = pydantic.Field(..., description="Arrivée -> premier token texte.")
+    latency: Percentiles = pydantic.Field(..., description="Arrivée -> fin du stream.")
+    max_queue_depth: int
+    max_in_flight: int
+    memory_per_session_kib: Optional[float] = None
+    scheduler: Dict[str, Any] = pydantic.Field(default={}, description="Métriques des files LLM du scheduler partagé.")
+
+    @property
+    def saturated(self) -> bool:
+        """Des requêtes ont été refusées, ou elles attendent plus longtemps qu'elles ne sont servies."""
+        return self.rejected > 0 or self.queue_delay.p95 > self.latency.p50 - self.queue_delay.p50
+
+
+# =================================================================== RUN
+
+
+def _serve(pipeline: Any, model_id: str, request: PipeRequest, timing: RequestTiming):
+    try:
+        result = pipeline.pipe(
+            user_message=request.user_message,
+            model_id=model_id,
+            messages=request.messages,
+            body=request.body,
+        )
+        for chunk in [result] if isinstance(result, str) else result:
+            if isinstance(chunk, str) and chunk:
+                if PIPELINE_ERROR in chunk:  # Les pipelines renvoient leurs exceptions sous forme de texte
+                    timing.error = chunk.strip()
+                if timing.first_token is None:
+                    timing.first_token = time.perf_counter()
+    except Exception as e:
+        timing.error = f"{type(e).__name__}: {e}"
+    finally:
+        timing.end = time.perf_counter()
+
+
+def run_load(
+    pipeline: Any,
+    requests: List[PipeRequest],
+    model_id: str,
+    rate: Optional[float],
+    concurrency: int,
+    max_queue: Optional[int] = None,
+    trace_memory: bool = False,
+    seed: int = 0,
+) -> LoadReport:
+    """
+    Envoie les requêtes selon un processus de Poisson de débit `rate` (open loop)
+    vers un pool de `concurrency` workers. Au-delà de `max_queue` requêtes en attente,
+    les nouvelles arrivées sont refusées (backpressure).
+    """
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    state = {"waiting": 0, "in_flight": 0, "max_waiting": 0, "max_in_flight": 0}
+    timings: List[RequestTiming] = []
+
+    def work(request: PipeRequest, timing: RequestTiming):
+        with lock:
+            state["waiting"] -= 1
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        timing.start = time.perf_counter()
+        with priority("eval"):  # Le trafic de test passe après les vrais utilisateurs
+            _serve(pipeline, model_id, request, timing)
+        with lock:
+            state["in_flight"] -= 1
+
+    if trace_memory:
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+
+    begin = time.perf_counter()
+    next_arrival = begin
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for request in requests:
+            if rate:
+                next_arrival += rng.expovariate(rate)
+                time.sleep(max(0.0, next_arrival - time.perf_counter()))
+            timing = RequestTiming(arrival=time.perf_counter())
+            timings.append(timing)
+            with lock:
+                if max_queue is not None and state["waiting"] >= max_queue:
+                    timing.rejected = True
+                    continue
+                state["waiting"] += 1
+                state["max_waiting"] = max(state["max_waiting"], state["waiting"])
+            executor.submit(work, request, timing)
+    duration = time.perf_counter() - begin
+
+    memory_per_session = None
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory_per_session = (peak - baseline) / max(1, state["max_in_flight"]) / 1024
+
+    served = [t for t in timings if not t.rejected]
+    completed = [t for t in served if t.error is None]
+    return LoadReport(
+        pipeline=type(pipeline).__module__,
+        rate=rate,
+        concurrency=concurrency,
+        requests=len(requests),
+        completed=len(completed),
+        errors=len(served) - len(completed),
+        rejected=len(timings) - len(served),
+        duration=duration,
+        throughput=len(completed) / duration if duration else 0.0,
+        queue_delay=Percentiles.of([t.start - t.arrival for t in served if t.start is not None]),
+        ttft=Percentiles.of([t.first_token - t.arrival for t in completed if t.first_token is not None]),
+        latency=Percentiles.of([t.end - t.arrival for t in completed if t.end is not None]),
+        max_queue_depth=state["max_waiting"],
+        max_in_flight=state["max_in_flight"],
+        memory_per_session_kib=memory_per_session,
+        scheduler={model: lane.model_dump() for model, lane in get_scheduler().metrics().items()},
+    )
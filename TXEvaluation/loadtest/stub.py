@@ -0,0 +1,119 @@
+"""
+Modèle de chat factice, utilisé à la place de ChatOllama / ChatOpenAI pour les tests de charge.
+Il imite l'interface utilisée par les pipelines (invoke, stream, bind_tools, with_structured_output)
+avec une latence réglable, sans aucun appel réseau.
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union, get_args, get_origin
+import json, random, time, types, typing, uuid, pydantic
+
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+
+
+class StubLatency(pydantic.BaseModel):
+    ttft: float = pydantic.Field(default=0.3, description="Délai avant le premier token (s).")
+    tokens_per_second: float = pydantic.Field(default=40.0, description="Débit de génération après le premier token.")
+    response_tokens: int = pydantic.Field(default=120, description="Nombre de tokens produits par réponse.")
+    jitter: float = pydantic.Field(default=0.1, description="Variation relative aléatoire appliquée aux délais.")
+
+
+def _placeholder(annotation: Any) -> Any:
+    """Valeur minimale valide pour une annotation de type."""
+    origin = get_origin(annotation)
+    if origin is typing.Literal:
+        return get_args(annotation)[0]
+    if origin in (typing.Union, types.UnionType):
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        return _placeholder(args[0]) if args else None
+    if origin in (list, set, tuple) or annotation in (list, set, tuple):
+        return []
+    if origin is dict or annotation is dict:
+        return {}
+    if isinstance(annotation, type) and issubclass(annotation, pydantic.BaseModel):
+        return _fill(annotation)
+    return {bool: True, int: 0, float: 0.0, str: "stub"}.get(annotation, None)
+
+
+def _fill(schema: type[pydantic.BaseModel]) -> Dict[str, Any]:
+    return {
+        name: _placeholder(field.annotation)
+        for name, field in schema.model_fields.items()
+        if field.is_required()
+    }
+
+
+def _tool_name(tool: Any) -> str:
+    return getattr(tool, "name", None) or getattr(tool, "__name__", "tool")
+
+
+class StubChatModel:
+    """
+    Remplaçant hors-ligne d'un modèle de chat langchain.
+
+    - structured : schéma (nom de classe, ou "title" d'un JSON schema) => fonction(messages) -> dict,
+      pour les sorties structurées.
+      Les schémas absents sont remplis avec des valeurs minimales valides.
+    - tool_args : nom du tool => arguments renvoyés lorsqu'un tool call est simulé.
+    - tool_call_rate : probabilité qu'un stream avec des tools commence par un tool call.
+    """
+
+    def __init__(
+        self,
+        latency: Optional[StubLatency] = None,
+        structured: Optional[Dict[str, Callable[[List[BaseMessage]], Dict[str, Any]]]] = None,
+        tool_args: Optional[Dict[str, Dict[str, Any]]] = None,
+        tool_call_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency or StubLatency()
+        self.structured = structured or {}
+        self.tool_args = tool_args or {}
+        self.tool_call_rate = tool_call_rate
+        self.rng = random.Random(seed)
+        self.tools: List[Any] = []
+        self.schema: Union[type[pydantic.BaseModel], Dict[str, Any], None] = None
+
+    def _copy(self, **changes) -> "StubChatModel":
+        clone = object.__new__(StubChatModel)
+        clone.__dict__.update(self.__dict__, **changes)
+        return clone
+
+    def _sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds * (1 + self.rng.uniform(-self.latency.jitter, self.latency.jitter)))
+
+    # =================================================================== LANGCHAIN INTERFACE
+
+    def bind_tools(self, tools: List[Any], **kwargs) -> "StubChatModel":
+        return self._copy(tools=list(tools))
+
+    def with_structured_output(self, schema: Union[type[pydantic.BaseModel], Dict[str, Any]], **kwargs) -> "StubChatModel":
+        return self._copy(schema=schema)
+
+    def invoke(self, messages: List[BaseMessage], **kwargs) -> Any:
+        self._sleep(self.latency.ttft + self.latency.response_tokens / self.latency.tokens_per_second)
+        if isinstance(self.schema, dict):  # JSON schema : sortie brute, non validée
+            make = self.structured.get(self.schema.get("title", ""))
+            return make(messages) if make else {}
+        if self.schema is not None:
+            make = self.structured.get(self.schema.__name__)
+            return self.schema.model_validate(make(messages) if make else _fill(self.schema))
+        return AIMessage(content=" ".join(["stub"] * self.latency.response_tokens))
+
+    def stream(self, messages: List[BaseMessage], **kwargs) -> Iterator[AIMessageChunk]:
+        self._sleep(self.latency.ttft)
+        if self.tools and self.rng.random() < self.tool_call_rate:
+            name = _tool_name(self.tools[0])
+            yield AIMessageChunk(
+                content="",
+                tool_call_chunks=[{
+                    "name": name,
+                    "args": json.dumps(self.tool_args.get(name, {})),
+                    "id": f"call_{uuid.uuid4().hex[:8]}",
+                    "index": 0,
+                }],
+            )
+            return
+        for _ in range(self.latency.response_tokens):
+            yield AIMessageChunk(content="stub ")
+            self._sleep(1 / self.latency.tokens_per_second)
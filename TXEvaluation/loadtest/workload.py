@@ -0,0 +1,78 @@
+"""
+Génération des requêtes rejouées contre Pipeline.pipe() :
+conversations issues de truth.json et documents synthétiques "uploadés" pour l'analyseur.
+"""
+
+from typing import Any, Dict, List, Optional
+import json, random, pathlib, pydantic
+
+TRUTH_PATH = pathlib.Path(__file__).resolve().parent.parent / "truth.json"
+
+
+class PipeRequest(pydantic.BaseModel):
+    """Arguments d'un appel à Pipeline.pipe()."""
+    user_message: str
+    messages: List[Dict[str, str]]
+    body: Dict[str, Any]
+
+
+def load_truth(path: pathlib.Path = TRUTH_PATH) -> Dict[str, List[str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def make_documents(
+    truth: Dict[str, List[str]], n_documents: int, document_words: int, rng: random.Random
+) -> Dict[str, str]:
+    """Documents synthétiques construits à partir du vocabulaire des réponses attendues."""
+    vocabulary = " ".join(item for items in truth.values() for item in items).split()
+    return {
+        f"document_{i + 1}.txt": " ".join(rng.choice(vocabulary) for _ in range(document_words))
+        for i in range(n_documents)
+    }
+
+
+def sources_system_message(documents: Dict[str, str]) -> Dict[str, str]:
+    """Message système au format produit par OpenWebUI lorsque des fichiers sont glissés dans le chat."""
+    return {
+        "role": "system",
+        "content": "\n".join(
+            f'<source id="{i + 1}" name="{name}">{content}</source>'
+            for i, (name, content) in enumerate(documents.items())
+        ),
+    }
+
+
+def make_requests(
+    n_requests: int,
+    model_id: str,
+    truth: Optional[Dict[str, List[str]]] = None,
+    n_documents: int = 0,
+    document_words: int = 2000,
+    seed: int = 0,
+) -> List[PipeRequest]:
+    """
+    Rejoue les questions de truth.json comme premier message d'une conversation.
+    Si n_documents > 0, chaque conversation commence par un message système contenant des documents.
+    """
+    rng = random.Random(seed)
+    truth = truth if truth is not None else load_truth()
+    questions = list(truth.keys())
+
+    requests = []
+    for i in range(n_requests):
+        question = questions[i % len(questions)]
+        messages = [{"role": "user", "content": question}]
+        if n_documents > 0:
+            messages.insert(0, sources_system_message(make_documents(truth, n_documents, document_words, rng)))
+        requests.append(PipeRequest(
+            user_message=question,
+            messages=messages,
+            body={
+                "stream": True,
+                "model": model_id,
+                "messages": messages,
+                "user": {"name": f"loadtest-{i}", "id": f"loadtest-{i}", "email": "loadtest@utc.fr", "role": "user"},
+            },
+        ))
+    return requests
@@ -1,52 +1,125 @@
-from typing import List, Set
-import json, pydantic, os, dotenv
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+import functools, json, pathlib, pydantic, os, dotenv
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from langchain_openai import ChatOpenAI
+from inferers.keyword_graph import KeywordGraph
+from inferers.keyword_ids import vocabulary_for
+from inferers.packing import DEFAULT_TOKEN_BUDGET, Candidate, PackedContext, approx_tokens, pack, rank_by_keywords
+from loaders.graph_index import graph_path
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+# L'index est configuré par variable d'environnement (ou .env), et non par le répertoire courant.
+DATA_DIR = pathlib.Path(__file__).resolve().parent / "data"
+INDEX_ENV = "TX_INDEX_PATH"
+
+
+@functools.cache
+def _load_env() -> None:
+    dotenv.load_dotenv()
+
+
+def index_path() -> pathlib.Path:
+    _load_env()
+    return pathlib.Path(os.getenv(INDEX_ENV) or DATA_DIR / "db_1.json")
+
+
+@functools.cache
+def load_db() -> Dict[str, Any]:
+    """
+    Index chargé au premier usage (et non à l'import du module).
+    """
+    with open(index_path(), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@functools.cache
+def load_graph() -> KeywordGraph:
+    """
+    Graphe de co-occurrence calculé à la création de l'index (python -m loaders.graph_index <index>),
+    ou construit depuis l'index s'il est absent.
+    """
+    path = graph_path(index_path())
+    return KeywordGraph.load(path) if path.exists() else KeywordGraph.build(load_db()["documents"])
+
+
+@functools.cache
+def token_counter() -> Callable[[str], int]:
+    """
+    Compteur tiktoken (cl100k_base, comme la pipeline) chargé au premier usage,
+    ou approximation à 4 caractères par token si l'encodage est indisponible hors-ligne.
+    """
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return approx_tokens
+    return lambda text: len(encoding.encode(text))
+
+
+@functools.lru_cache(maxsize=4)
+def chat(model: str) -> "ChatOpenAI":
+    """Client OpenAI réutilisé entre les appels, importé au premier usage."""
+    from langchain_openai import ChatOpenAI
+
+    _load_env()
+    return ChatOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),  # type: ignore
+        model=model,
+    )
+
+
+class RAGResponse(pydantic.BaseModel):
+    content: str
+    context: PackedContext = pydantic.Field(..., description="Chunks retenus dans le budget de tokens, pour l'évaluation.")
 
-dotenv.load_dotenv()
 
-with open("rag/data/db_1.json", "r", encoding="utf-8") as f:
-    db = json.load(f)
-    
-with open("rag/data/keyword_prompt_1.json", "r", encoding="utf-8") as f:
-    keyword_prompt = f.read()
-    
-class KW(pydantic.BaseModel):
-    keywords: List[str]
-    
 def respond(user_input: str) -> str:
     """
     Run the RAG system once assuming the user input is the first message a user sends to the system.
     """
-    response_1: KW = ChatOpenAI(
-        api_key=os.getenv("OPENAI_API_KEY"),  # type: ignore
-        model="gpt-4.1-mini",
-    ).with_structured_output(KW).invoke(
+    return run(user_input).content
+
+
+def run(user_input: str, token_budget: int = DEFAULT_TOKEN_BUDGET, expansion: Optional[float] = None) -> RAGResponse:
+    """
+    Comme respond, en exposant le contexte empaqueté (budget, chunks retenus / écartés).
+    Avec `expansion` (poids minimal des arêtes, ex: 0.5), les mots clés sélectionnés sont étendus à un saut
+    dans le graphe de co-occurrence avant la récupération des chunks.
+    """
+    db = load_db()
+    vocabulary = vocabulary_for(db["keywords"].keys(), db.get("aliases"))
+    response_1 = chat("gpt-4.1-mini").with_structured_output(vocabulary.json_schema()).invoke(
         [
             SystemMessage(
                 content="Sélectionne tous les mots clés qui correspondent à peu près à la situation de l'utilisateur d'après la conversation."
-                        + "\nSélectionne uniquement les mots clés parmi la liste suivante:"
-                        + str(list(db["keywords"].keys()))
-                        + "\n\nVoici quelques informations additionnelles sur les mots clés et les informations disponibles:\n"
+                        + "\nRéponds avec les numéros des mots clés choisis, uniquement parmi la liste suivante (numéro mot-clé):\n"
+                        + vocabulary.prompt()
             ),
             HumanMessage(content=user_input),
         ]
     )
-    
-    chunks: Set[str] = set()
-    for k in response_1.keywords:
-        chunks.update([doc for doc, doc_kws in db["documents"].items() if k in doc_kws])
+    keywords = vocabulary.resolve_output(response_1)
+    neighbors = load_graph().expand(keywords, min_weight=expansion) if expansion is not None else None
 
-    response_2: AIMessage = ChatOpenAI(
-        api_key=os.getenv("OPENAI_API_KEY"),  # type: ignore
-        model="o4-mini",
-    ).invoke(
+    return answer(user_input, rank_by_keywords(db["documents"], keywords, neighbors), token_budget)
+
+
+def answer(user_input: str, candidates: List[Candidate], token_budget: int = DEFAULT_TOKEN_BUDGET) -> RAGResponse:
+    """
+    Répond à l'utilisateur à partir des chunks candidats, dédupliqués et empaquetés dans le budget de tokens
+    (étape commune à toutes les méthodes de récupération).
+    """
+    context = pack(candidates, token_budget, count_tokens=token_counter())
+
+    response_2: AIMessage = chat("o4-mini").invoke(
         [
             SystemMessage(
                 content="Répond à la requête de l'utilisateur. "
                         + "Utilise tes connaissances si elles sont pertinentes."
                         + "\nConnaissances:\n"
-                        + "\n".join(chunks)
+                        + context.render()
                         
             ),
             HumanMessage(content=user_input),
@@ -54,6 +127,6 @@ def respond(user_input: str) -> str:
     )
     
     if isinstance(response_2.content, str):
-        return response_2.content
+        return RAGResponse(content=response_2.content, context=context)
     else:
         raise ValueError("Expected response_2.content to be a string, got: " + str(type(response_2.content)))
@@ -0,0 +1,43 @@
+from typing import List, Tuple
+import functools, os
+
+from inferers.packing import DEFAULT_TOKEN_BUDGET, rank_by_score
+from inferers.vector_db import VectorDB
+from loaders.embed_index import EMBEDDERS, embeddings_path
+
+from .keywords_inference import RAGResponse, answer, index_path, load_db
+
+
+@functools.cache
+def load_vector_db() -> VectorDB:
+    """
+    Embeddings calculés à la création de l'index (python -m loaders.embed_index <index>), chargés au premier usage.
+    TX_EMBEDDER=hash permet d'utiliser l'embedder local déterministe (tests, pas d'appel réseau).
+    """
+    return VectorDB.load(
+        str(embeddings_path(index_path())),
+        EMBEDDERS[os.getenv("TX_EMBEDDER", "openai")](),
+        documents=list(load_db()["documents"].keys()),
+    )
+
+
+def retrieve(user_input: str, k: int = 8) -> List[Tuple[str, float]]:
+    """
+    Récupère les k documents les plus proches : un embedding de requête (en cache) et un produit matriciel,
+    à la place de l'appel LLM de sélection de mots clés.
+    """
+    return load_vector_db().search(user_input, k)
+
+
+def respond(user_input: str) -> str:
+    """
+    Run the RAG system once with dense vector retrieval, assuming the user input is the first message a user sends to the system.
+    """
+    return run(user_input).content
+
+
+def run(user_input: str, token_budget: int = DEFAULT_TOKEN_BUDGET) -> RAGResponse:
+    """
+    Comme respond, en exposant le contexte empaqueté (budget, chunks retenus / écartés).
+    """
+    return answer(user_input, rank_by_score(retrieve(user_input)), token_budget)
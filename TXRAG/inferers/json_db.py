@@ -7,8 +7,17 @@ from .base_db import BaseKeywordDB
 class JSONKeywordDB(BaseKeywordDB, pydantic.BaseModel):
     keywords: Dict[str, str] = {}  # keyword : description
     documents: Dict[str, List[str]] = {}  # Doc : List[keywords]
+    aliases: Dict[str, List[str]] = {}  # keyword canonique : mots clés fusionnés (cf. loaders.compact_keywords)
+
+    def canonical(self, keyword: str) -> str:
+        for canonical, aliases in self.aliases.items():
+            if keyword in aliases:
+                return canonical
+        return keyword
 
     def get(self, keywords: List[str]) -> List[str]:
+        if self.aliases:
+            keywords = [self.canonical(keyword) for keyword in keywords]
         result = []
         for document, doc_keywords in self.documents.items():
             if any(keyword in doc_keywords for keyword in keywords):
@@ -0,0 +1,70 @@
+from typing import Dict, Iterable, List, Tuple
+import itertools, json, pathlib
+import pydantic
+
+DEFAULT_MIN_WEIGHT = 0.5
+
+
+class KeywordGraph(pydantic.BaseModel):
+    """
+    Graphe de co-occurrence des mots clés d'un index (deux mots clés sont liés s'ils étiquettent un même document),
+    en mémoire sous forme de listes d'adjacence. Le poids de l'arête a -> b est la part des documents de a
+    qui portent aussi b : pas-d-internet -> dns vaut 0.8 si 4 fiches sur 5 de pas-d-internet parlent aussi de DNS.
+    """
+    usage: Dict[str, int] = pydantic.Field(default={}, description="Mot clé => nombre de documents qui le portent.")
+    edges: Dict[str, Dict[str, int]] = pydantic.Field(default={}, description="Mot clé => voisin => documents communs.")
+
+    @classmethod
+    def build(cls, documents: Dict[str, List[str]]) -> "KeywordGraph":
+        """Graphe d'un index JSONKeywordDB (documents => mots clés), en un passage sur les documents."""
+        usage: Dict[str, int] = {}
+        edges: Dict[str, Dict[str, int]] = {}
+        for doc_keywords in documents.values():
+            doc_keywords = list(dict.fromkeys(doc_keywords))
+            for keyword in doc_keywords:
+                usage[keyword] = usage.get(keyword, 0) + 1
+            for a, b in itertools.permutations(doc_keywords, 2):
+                neighbors = edges.setdefault(a, {})
+                neighbors[b] = neighbors.get(b, 0) + 1
+        return cls(usage=usage, edges=edges)
+
+    def weight(self, a: str, b: str) -> float:
+        count = self.edges.get(a, {}).get(b, 0)
+        return count / self.usage[a] if count else 0.0
+
+    def neighbors(self, keyword: str, min_weight: float = DEFAULT_MIN_WEIGHT, min_count: int = 1) -> List[Tuple[str, float]]:
+        """Voisins reliés par une arête forte (poids et documents communs suffisants), du plus fort au plus faible."""
+        strong = [
+            (neighbor, count / self.usage[keyword])
+            for neighbor, count in self.edges.get(keyword, {}).items()
+            if count >= min_count and count / self.usage[keyword] >= min_weight
+        ]
+        return sorted(strong, key=lambda edge: (-edge[1], edge[0]))
+
+    def expand(
+        self,
+        keywords: Iterable[str],
+        min_weight: float = DEFAULT_MIN_WEIGHT,
+        min_count: int = 1,
+        max_neighbors: int = 3,
+    ) -> Dict[str, float]:
+        """
+        Expansion à un saut : jusqu'à `max_neighbors` voisins forts de chaque mot clé sélectionné (hors sélection),
+        avec le poids de l'arête la plus forte qui y mène. Le résultat se passe à packing.rank_by_keywords
+        (argument `expansion`), qui garde les documents des mots clés sélectionnés en tête.
+        """
+        selected = list(dict.fromkeys(keywords))
+        weights: Dict[str, float] = {}
+        for keyword in selected:
+            neighbors = [edge for edge in self.neighbors(keyword, min_weight, min_count) if edge[0] not in selected]
+            for neighbor, weight in neighbors[:max_neighbors]:
+                weights[neighbor] = max(weights.get(neighbor, 0.0), weight)
+        return weights
+
+    def save(self, path: str | pathlib.Path):
+        pathlib.Path(path).write_text(self.model_dump_json(), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str | pathlib.Path) -> "KeywordGraph":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.model_validate(json.load(f))
@@ -0,0 +1,106 @@
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import difflib, functools, hashlib, json, logging, re, unicodedata
+import pydantic
+
+logger = logging.getLogger(__name__)
+
+
+def slugify(text: str) -> str:
+    """'Login refusé' => 'login-refuse' (format lower+dash des mots clés de l'index)."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", "-", text).strip("-")
+
+
+class KeywordVocabulary(pydantic.BaseModel):
+    """
+    Table mot clé <=> identifiant entier d'un index. Le LLM choisit des identifiants courts dans
+    un enum au lieu de recopier les slugs, puis les sorties sont résolues localement.
+    """
+    version: str = pydantic.Field(..., description="Empreinte de la liste de mots clés de l'index.")
+    keywords: List[str] = pydantic.Field(..., description="Mots clés, l'identifiant est la position dans la liste.")
+    aliases: Dict[str, str] = pydantic.Field(default={}, description="Alias fusionné => mot clé canonique (JSONKeywordDB.aliases).")
+
+    @functools.cached_property
+    def _by_slug(self) -> Dict[str, str]:
+        by_slug = {slugify(alias): keyword for alias, keyword in self.aliases.items()}
+        by_slug.update({slugify(keyword): keyword for keyword in self.keywords})
+        return by_slug
+
+    def prompt(self) -> str:
+        """Liste compacte 'id mot-clé', une ligne par mot clé."""
+        return "\n".join(f"{i} {keyword}" for i, keyword in enumerate(self.keywords))
+
+    def json_schema(self) -> Dict[str, Any]:
+        """
+        Schéma de sortie structurée : une liste d'identifiants contrainte par un enum.
+        C'est un dict JSON schema (et non un modèle pydantic) pour que la sortie brute
+        soit rendue telle quelle et résolue par `resolve`, même hors vocabulaire.
+        """
+        return {
+            "title": "KW",
+            "description": "Identifiants des mots clés sélectionnés.",
+            "type": "object",
+            "properties": {
+                "keywords": {
+                    "type": "array",
+                    "items": {"type": "integer", "enum": list(range(len(self.keywords)))},
+                },
+            },
+            "required": ["keywords"],
+        }
+
+    def _resolve_one(self, value: Union[int, str]) -> Union[str, None]:
+        if isinstance(value, str) and value.strip().isdigit():
+            value = int(value)
+        if isinstance(value, bool):  # bool est un int : True ne désigne pas le mot clé n°1
+            return None
+        if isinstance(value, int):
+            return self.keywords[value] if 0 <= value < len(self.keywords) else None
+        slug = slugify(str(value))
+        if slug in self._by_slug:
+            return self._by_slug[slug]
+        close = difflib.get_close_matches(slug, self._by_slug.keys(), n=1, cutoff=0.8)
+        return self._by_slug[close[0]] if close else None
+
+    def resolve(self, values: Iterable[Union[int, str]]) -> List[str]:
+        """
+        Convertit la sortie du LLM en mots clés de l'index : identifiants, slugs exacts, alias,
+        ou slugs approchants (fautes, accents, mots clés inventés proches d'un existant).
+        Les valeurs sans correspondance sont ignorées.
+        """
+        resolved: List[str] = []
+        for value in values:
+            keyword = self._resolve_one(value)
+            if keyword is None:
+                logger.info(f"Mot clé ignoré, absent du vocabulaire : {value!r}")
+            elif keyword not in resolved:
+                resolved.append(keyword)
+        return resolved
+
+    def resolve_output(self, output: Any) -> List[str]:
+        """Résout la sortie structurée brute ({"keywords": [...]}) du LLM."""
+        if isinstance(output, pydantic.BaseModel):
+            output = output.model_dump()
+        values = output.get("keywords", []) if isinstance(output, dict) else []
+        return self.resolve(values if isinstance(values, list) else [values])
+
+
+def vocabulary_version(keywords: Sequence[str]) -> str:
+    return hashlib.sha1(json.dumps(list(keywords), ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+
+
+@functools.lru_cache(maxsize=16)
+def _vocabulary(keywords: Tuple[str, ...], aliases: Tuple[Tuple[str, str], ...]) -> KeywordVocabulary:
+    return KeywordVocabulary(version=vocabulary_version(keywords), keywords=list(keywords), aliases=dict(aliases))
+
+
+def vocabulary_for(keywords: Iterable[str], aliases: Optional[Dict[str, List[str]]] = None) -> KeywordVocabulary:
+    """
+    Vocabulaire d'un index (ex: JSONKeywordDB.keywords), mis en cache par version de l'index :
+    les identifiants restent stables tant que la liste de mots clés ne change pas.
+    Les alias d'un index compacté ne sont pas listés dans le prompt, mais restent reconnus en sortie.
+    """
+    inverse = tuple(sorted((alias, canonical) for canonical, merged in (aliases or {}).items() for alias in merged))
+    return _vocabulary(tuple(keywords), inverse)
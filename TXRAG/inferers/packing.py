@@ -0,0 +1,119 @@
+
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+import re
+import pydantic
+
+DEFAULT_TOKEN_BUDGET = 2000
+
+
+def approx_tokens(text: str) -> int:
+    """
+    Estimation sans tokenizer (~4 caractères par token), utilisée si aucun compteur n'est fourni.
+    """
+    return len(text) // 4 + 1
+
+
+class Candidate(pydantic.BaseModel):
+    text: str
+    score: float = pydantic.Field(..., description="Pertinence : recouvrement de mots clés ou score du retriever.")
+
+
+class PackedContext(pydantic.BaseModel):
+    chunks: List[str] = []
+    tokens: int = 0
+    budget: int
+    candidates: int = 0
+    duplicates: int = pydantic.Field(default=0, description="Chunks écartés car quasi-identiques à un chunk retenu.")
+    over_budget: int = pydantic.Field(default=0, description="Chunks écartés faute de place dans le budget.")
+
+    def render(self) -> str:
+        return "\n\n---\n\n".join(self.chunks)
+
+
+# =================================================================== RANKING
+
+def rank_by_keywords(
+    documents: Dict[str, List[str]], keywords: Iterable[str], expansion: Optional[Mapping[str, float]] = None
+) -> List[Candidate]:
+    """
+    Candidats d'une base mots clés (JSONKeywordDB.documents), classés par nombre de mots clés sélectionnés
+    qu'ils portent. Avec `expansion` (mot clé voisin => poids, cf. KeywordGraph.expand), les documents des voisins
+    sont aussi candidats : la somme de leurs poids, ramenée sous 1, ne fait que départager les documents
+    à nombre de mots clés sélectionnés égal. Un document portant un mot clé sélectionné reste donc toujours devant
+    ceux qui ne portent que des voisins. Les documents sans aucun mot clé sélectionné ni voisin sont ignorés.
+    """
+    selected = set(keywords)
+    if not expansion:
+        candidates = [
+            Candidate(text=document, score=len(selected.intersection(doc_keywords)))
+            for document, doc_keywords in documents.items()
+        ]
+        return [c for c in candidates if c.score > 0]
+
+    candidates = []
+    for document, doc_keywords in documents.items():
+        doc_keywords = set(doc_keywords)
+        neighbors = sum(expansion.get(keyword, 0.0) for keyword in doc_keywords - selected)
+        score = len(selected & doc_keywords) + neighbors / (1 + neighbors)
+        if score > 0:
+            candidates.append(Candidate(text=document, score=score))
+    return candidates
+
+
+def rank_by_score(results: Iterable[Tuple[str, float]]) -> List[Candidate]:
+    """Candidats issus d'un retriever (document, score), par exemple VectorDB.search."""
+    return [Candidate(text=text, score=score) for text, score in results]
+
+
+# =================================================================== PACKING
+
+def _shingles(text: str, size: int = 3) -> Set[Tuple[str, ...]]:
+    words = re.findall(r"\w+", text.casefold())
+    return {tuple(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def _jaccard(a: Set, b: Set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def pack(
+    candidates: List[Candidate],
+    budget: int = DEFAULT_TOKEN_BUDGET,
+    count_tokens: Callable[[str], int] = approx_tokens,
+    duplicate_threshold: float = 0.8,
+    min_chunk_tokens: int = 16,
+) -> PackedContext:
+    """
+    Remplit gloutonnement un budget de tokens avec les meilleurs candidats :
+    - tri stable par score décroissant (à score égal, l'ordre d'entrée est conservé),
+    - les chunks quasi-dupliqués d'un chunk déjà retenu (Jaccard des 3-grammes de mots) sont écartés,
+    - un chunk qui ne rentre pas est sauté, les suivants plus courts peuvent encore rentrer,
+    - dès qu'il reste moins de `min_chunk_tokens` tokens, les candidats restants sont écartés sans être examinés.
+    Les tests les moins coûteux (texte identique, place restante) passent avant la comparaison des 3-grammes.
+    """
+    packed = PackedContext(budget=budget, candidates=len(candidates))
+    kept: List[Set[Tuple[str, ...]]] = []
+    seen: Set[str] = set()
+
+    ranked = sorted(candidates, key=lambda c: -c.score)
+    for i, candidate in enumerate(ranked):
+        if budget - packed.tokens < min_chunk_tokens:
+            packed.over_budget += len(ranked) - i  # Budget plein : inutile d'examiner la suite
+            break
+        if candidate.text in seen:
+            packed.duplicates += 1
+            continue
+        tokens = count_tokens(candidate.text)
+        if packed.tokens + tokens > budget:
+            packed.over_budget += 1
+            continue
+        shingles = _shingles(candidate.text)
+        if any(_jaccard(shingles, other) >= duplicate_threshold for other in kept):
+            packed.duplicates += 1
+            continue
+        packed.chunks.append(candidate.text)
+        packed.tokens += tokens
+        kept.append(shingles)
+        seen.add(candidate.text)
+
+    return packed
@@ -0,0 +1,166 @@
+
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from collections import OrderedDict
+import abc, functools, hashlib, json, re, threading, unicodedata
+import numpy, pydantic
+
+if TYPE_CHECKING:
+    from langchain_openai import OpenAIEmbeddings
+
+
+def normalize_text(text: str) -> str:
+    """Clé de cache : casse, accents et espaces normalisés."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+# =================================================================== EMBEDDERS
+
+class BaseEmbedder(abc.ABC):
+
+    @property
+    @abc.abstractmethod
+    def name(self) -> str:
+        """
+        Identifiant du modèle d'embedding, enregistré avec l'index.
+        """
+        pass
+
+    @abc.abstractmethod
+    def embed(self, texts: List[str]) -> numpy.ndarray:
+        """
+        Renvoie une matrice (len(texts), dim) d'embeddings.
+        """
+        pass
+
+
+class HashEmbedder(BaseEmbedder, pydantic.BaseModel):
+    """
+    Embedder local et déterministe (hashing trick sur les mots et trigrammes de caractères).
+    Aucun appel réseau : utile pour les tests et les benchmarks.
+    """
+    dim: int = 256
+
+    @property
+    def name(self) -> str:
+        return f"hash-{self.dim}"
+
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r"\w+", normalize_text(text))
+        return words + [w[i:i + 3] for w in words if len(w) > 3 for i in range(len(w) - 2)]
+
+    def embed(self, texts: List[str]) -> numpy.ndarray:
+        matrix = numpy.zeros((len(texts), self.dim), dtype=numpy.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                matrix[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+        return matrix
+
+
+class OpenAIEmbedder(BaseEmbedder, pydantic.BaseModel):
+    """
+    Embeddings OpenAI (même modèle que l'EMBEDDING_MODEL de Lightrag).
+    """
+    model: str = "text-embedding-3-small"
+    api_key: Optional[str] = None
+    base_url: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return self.model
+
+    @functools.cached_property
+    def _client(self) -> "OpenAIEmbeddings":
+        """Client (et ses connexions HTTP) créé au premier appel, puis réutilisé."""
+        from langchain_openai import OpenAIEmbeddings
+
+        return OpenAIEmbeddings(model=self.model, api_key=self.api_key, base_url=self.base_url)  # type: ignore
+
+    def embed(self, texts: List[str]) -> numpy.ndarray:
+        return numpy.asarray(self._client.embed_documents(texts), dtype=numpy.float32)
+
+
+# =================================================================== VECTOR INDEX
+
+class VectorDB:
+    """
+    Index dense en mémoire : une matrice NumPy d'embeddings normalisés, calculée une fois à la
+    création de l'index. Une recherche top-k coûte un embedding de la requête (mis en cache
+    par texte normalisé) et un produit matrice-vecteur.
+    """
+
+    def __init__(self, documents: List[str], embeddings: numpy.ndarray, embedder: BaseEmbedder, cache_size: int = 1024):
+        if len(documents) != len(embeddings):
+            raise ValueError(f"{len(documents)} documents mais {len(embeddings)} embeddings.")
+        self.documents = list(documents)
+        self.embeddings = self._normalize(numpy.asarray(embeddings, dtype=numpy.float32))
+        self.embedder = embedder
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, numpy.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(matrix: numpy.ndarray) -> numpy.ndarray:
+        norms = numpy.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / numpy.where(norms == 0, 1, norms)
+
+    @classmethod
+    def build(cls, documents: List[str], embedder: BaseEmbedder, batch_size: int = 256) -> "VectorDB":
+        """Calcule les embeddings de tous les documents (à faire une fois, à la création de l'index)."""
+        batches = [embedder.embed(documents[i:i + batch_size]) for i in range(0, len(documents), batch_size)]
+        embeddings = numpy.concatenate(batches) if batches else numpy.zeros((0, 1), dtype=numpy.float32)
+        return cls(documents, embeddings, embedder)
+
+    def save(self, path: str) -> None:
+        """Documents en JSON UTF-8 (un tableau de chaînes NumPy réserverait la taille du plus long pour chacun)."""
+        documents = numpy.frombuffer(json.dumps(self.documents, ensure_ascii=False).encode("utf-8"), dtype=numpy.uint8)
+        numpy.savez(path, embeddings=self.embeddings, documents=documents, model=self.embedder.name)
+
+    @staticmethod
+    def _stored_documents(documents: numpy.ndarray) -> List[str]:
+        if documents.dtype.kind == "U":  # Index enregistré avant le format JSON
+            return [str(d) for d in documents]
+        return json.loads(documents.tobytes().decode("utf-8"))
+
+    @classmethod
+    def load(cls, path: str, embedder: BaseEmbedder, documents: Optional[List[str]] = None) -> "VectorDB":
+        """
+        Charge un index sauvegardé. Si `documents` est fourni (documents de la JSONKeywordDB),
+        vérifie qu'il correspond toujours aux embeddings.
+        """
+        with numpy.load(path) as data:
+            stored = cls._stored_documents(data["documents"])
+            if str(data["model"]) != embedder.name:
+                raise ValueError(f"Index calculé avec {data['model']}, embedder fourni : {embedder.name}.")
+            if documents is not None and documents != stored:
+                raise ValueError("Les embeddings ne correspondent plus aux documents de l'index, recalculez-les.")
+            return cls(stored, data["embeddings"], embedder)
+
+    def embed_query(self, query: str) -> numpy.ndarray:
+        key = normalize_text(query)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        vector = self._normalize(self.embedder.embed([query])[0])
+        with self._lock:
+            self._cache[key] = vector
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return vector
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        """Renvoie les k documents les plus proches de la requête, avec leur similarité cosinus."""
+        if not self.documents:
+            return []
+        scores = self.embeddings @ self.embed_query(query)
+        k = min(k, len(self.documents))
+        top = numpy.argpartition(-scores, k - 1)[:k]
+        top = top[numpy.argsort(-scores[top], kind="stable")]
+        return [(self.documents[i], float(scores[i])) for i in top]
+
+    def get(self, query: str, k: int = 5) -> List[str]:
+        return [document for document, _ in self.search(query, k)]
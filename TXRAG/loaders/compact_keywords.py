@@ -0,0 +1,245 @@
+"""
+Compacte le vocabulaire d'un index : les mots clés quasi-synonymes créés par le LLM à l'attribution
+(étape 4 du playground) sont regroupés sous un mot clé canonique, avec la liste de leurs alias,
+et les documents sont réécrits en conséquence. Le vocabulaire est recopié dans chaque prompt
+de sélection de mots clés : le compacter raccourcit ce prompt à chaque tour.
+
+    python -m loaders.compact_keywords data/index/db_1.json --output data/index/db_1.json [--embedder openai]
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse, difflib, functools, json, pathlib, dotenv, numpy, pydantic
+from collections import Counter, defaultdict
+
+from inferers.json_db import JSONKeywordDB
+from inferers.keyword_ids import slugify, vocabulary_for
+from inferers.packing import approx_tokens
+from inferers.vector_db import BaseEmbedder
+
+from .embed_index import EMBEDDERS
+
+
+class KeywordCluster(pydantic.BaseModel):
+    canonical: str
+    aliases: List[str] = []
+    documents: int = pydantic.Field(default=0, description="Documents portant au moins un mot clé du groupe.")
+
+
+class CompactionReport(pydantic.BaseModel):
+    clusters: List[KeywordCluster] = pydantic.Field(..., description="Groupes fusionnés (au moins un alias).")
+    keywords_before: int
+    keywords_after: int
+    prompt_tokens_before: int = pydantic.Field(..., description="Tokens du vocabulaire recopié dans le prompt de sélection.")
+    prompt_tokens_after: int
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.prompt_tokens_before - self.prompt_tokens_after
+
+
+# =================================================================== SIMILARITY
+
+STOPWORDS = {"a", "au", "aux", "d", "de", "des", "du", "en", "et", "l", "la", "le", "les"}
+
+
+def keyword_tokens(keyword: str) -> List[str]:
+    """'Mot-de-passe-oublié' => ['mot', 'passe', 'oublie']"""
+    return [token for token in slugify(keyword).split("-") if token and token not in STOPWORDS]
+
+
+@functools.lru_cache(maxsize=None)
+def _same_token(a: str, b: str) -> bool:
+    """
+    Mots identiques, ou assez longs et à une faute près (inacessible ~ inaccessible, connection ~ connexion).
+    Le début du mot doit être identique : deconnecte !~ connecte, desinstallation !~ installation.
+    """
+    return a == b or (
+        min(len(a), len(b)) >= 4 and a[:2] == b[:2] and difflib.SequenceMatcher(None, a, b).ratio() >= 0.8
+    )
+
+
+def string_similarity(a: str, b: str) -> float:
+    """
+    Similarité des slugs mot à mot (Dice sur les mots, à une faute près), insensible aux accents,
+    aux mots outils et à l'ordre : mail-envoi-echoue ~ envoi-du-mail-echoue, mais wifi-lent-cr !~ wifi-lent-pg ou wifi-lent.
+    """
+    tokens_a, tokens_b = keyword_tokens(a), keyword_tokens(b)
+    if not tokens_a or not tokens_b:
+        return float(slugify(a) == slugify(b))
+    return _tokens_similarity(tokens_a, tokens_b)
+
+
+def _tokens_similarity(tokens_a: List[str], tokens_b: List[str]) -> float:
+    if tokens_a == tokens_b:
+        return 1.0
+    remaining, matched = list(tokens_b), 0
+    for token in tokens_a:
+        match = next((other for other in remaining if _same_token(token, other)), None)
+        if match is not None:
+            remaining.remove(match)
+            matched += 1
+    return 2 * matched / (len(tokens_a) + len(tokens_b))
+
+
+def keyword_text(keyword: str, description: str) -> str:
+    """Texte embarqué pour un mot clé : le slug en clair et sa description éventuelle."""
+    return keyword.replace("-", " ") + (f" : {description}" if description else "")
+
+
+# =================================================================== CLUSTERING
+
+
+def cluster_keywords(
+    db: JSONKeywordDB,
+    threshold: float = 0.9,
+    embedder: Optional[BaseEmbedder] = None,
+    embedding_threshold: float = 0.9,
+) -> List[KeywordCluster]:
+    """
+    Regroupement par "leader" : les mots clés sont parcourus du plus utilisé au moins utilisé, et chacun rejoint
+    le premier canonique assez proche (slug, ou embedding si un embedder est fourni), sinon devient canonique.
+    Comparer aux seuls canoniques évite les chaînes de fusions (a ~ b ~ c sans a ~ c).
+    Seuls les canoniques partageant un préfixe de mot (3 lettres) sont comparés par slug, pour rester rapide
+    sur des milliers de mots clés.
+    """
+    usage: Dict[str, int] = {keyword: 0 for keyword in db.keywords}
+    for doc_keywords in db.documents.values():
+        for keyword in set(doc_keywords):
+            usage[keyword] = usage.get(keyword, 0) + 1
+    tokens_of = {keyword: keyword_tokens(keyword) for keyword in usage}  # Slugifiés une seule fois
+    frequency = Counter(token for keyword_words in tokens_of.values() for token in set(keyword_words))
+    for description in db.keywords.values():
+        frequency.update(set(keyword_tokens(description)))
+    spelling = lambda k: min((frequency[token] for token in tokens_of[k]), default=0)
+    # Canonique : le plus utilisé, au format slug, à l'orthographe la plus courante (son mot le plus rare est le plus
+    # fréquent dans les mots clés et descriptions : lecteur-inaccessible plutôt que inacessible-lecteur), puis le plus court
+    keywords = sorted(usage, key=lambda k: (-usage[k], slugify(k) != k, -spelling(k), len(k), k))
+
+    cosine = None
+    if embedder is not None:
+        vectors = embedder.embed([keyword_text(k, db.keywords.get(k, "")) for k in keywords])
+        vectors = vectors / numpy.maximum(numpy.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+        cosine = vectors @ vectors.T
+
+    tokens = [tokens_of[keyword] for keyword in keywords]
+    sizes = [len(keyword_words) for keyword_words in tokens]
+    leaders: List[int] = []
+    members: Dict[int, List[int]] = {}
+    by_prefix: Dict[str, List[int]] = defaultdict(list)  # préfixe de mot => canoniques
+    for i, keyword in enumerate(keywords):
+        prefixes = {token[:3] for token in tokens[i]} or {slugify(keyword)[:3]}
+        size = sizes[i]
+        matches = [
+            j for j in {j for p in prefixes for j in by_prefix[p]}
+            if 2 * min(size, sizes[j]) / (size + sizes[j]) >= threshold  # Borne du Dice selon le nombre de mots
+            and (
+                _tokens_similarity(tokens[i], tokens[j]) if tokens[i] and tokens[j]
+                else string_similarity(keyword, keywords[j])
+            ) >= threshold
+        ]
+        if cosine is not None and leaders:
+            matches += [leaders[k] for k in numpy.flatnonzero(cosine[i, leaders] >= embedding_threshold)]
+        if matches:
+            members[min(matches)].append(i)  # Le canonique le plus utilisé
+        else:
+            leaders.append(i)
+            members[i] = []
+            for prefix in prefixes:
+                by_prefix[prefix].append(i)
+
+    canonical = {keywords[i]: keywords[leader] for leader in leaders for i in [leader, *members[leader]]}
+    documents: Dict[str, int] = defaultdict(int)  # Un seul passage sur les documents
+    for doc_keywords in db.documents.values():
+        for keyword in {canonical[k] for k in doc_keywords}:
+            documents[keyword] += 1
+
+    return [
+        KeywordCluster(
+            canonical=keywords[leader],
+            aliases=[keywords[i] for i in members[leader]],
+            documents=documents[keywords[leader]],
+        )
+        for leader in leaders
+    ]
+
+
+def compact(
+    db: JSONKeywordDB,
+    threshold: float = 0.9,
+    embedder: Optional[BaseEmbedder] = None,
+    embedding_threshold: float = 0.9,
+    count_tokens: Callable[[str], int] = approx_tokens,
+) -> Tuple[JSONKeywordDB, CompactionReport]:
+    """
+    Fusionne les mots clés quasi-dupliqués de l'index : les documents ne portent plus que des mots clés canoniques,
+    et les alias (y compris ceux d'une compaction précédente) sont conservés dans JSONKeywordDB.aliases.
+    """
+    clusters = cluster_keywords(db, threshold, embedder, embedding_threshold)
+    canonical = {alias: cluster.canonical for cluster in clusters for alias in cluster.aliases}
+
+    aliases: Dict[str, List[str]] = {}
+    for cluster in clusters:
+        merged = list(cluster.aliases)
+        for keyword in [cluster.canonical, *cluster.aliases]:
+            merged += db.aliases.get(keyword, [])
+        if merged:
+            aliases[cluster.canonical] = merged
+
+    documents = {
+        document: list(dict.fromkeys(canonical.get(keyword, keyword) for keyword in doc_keywords))
+        for document, doc_keywords in db.documents.items()
+    }
+    keywords = {}
+    for cluster in clusters:  # Garde la première description non vide du groupe
+        descriptions = [db.keywords.get(k, "") for k in [cluster.canonical, *cluster.aliases]]
+        keywords[cluster.canonical] = next((d for d in descriptions if d), "")
+
+    compacted = JSONKeywordDB(keywords=keywords, documents=documents, aliases=aliases)
+    report = CompactionReport(
+        clusters=[cluster for cluster in clusters if cluster.aliases],
+        keywords_before=len(db.keywords),
+        keywords_after=len(compacted.keywords),
+        prompt_tokens_before=count_tokens(vocabulary_for(db.keywords.keys()).prompt()),
+        prompt_tokens_after=count_tokens(vocabulary_for(compacted.keywords.keys()).prompt()),
+    )
+    return compacted, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fusion des mots clés quasi-synonymes d'un index JSONKeywordDB")
+    parser.add_argument("index", help="Chemin de l'index JSON (ex: data/index/db_1.json)")
+    parser.add_argument("--output", default=None, help="Index compacté à écrire (défaut : affiche seulement le rapport)")
+    parser.add_argument("--threshold", type=float, default=0.9, help="Similarité minimale des slugs (0-1)")
+    parser.add_argument("--embedder", choices=EMBEDDERS.keys(), default=None, help="Compare aussi les embeddings des mots clés")
+    parser.add_argument("--embedding-threshold", type=float, default=0.9, help="Similarité cosinus minimale des embeddings")
+    args = parser.parse_args()
+
+    dotenv.load_dotenv()
+    with open(args.index, "r", encoding="utf-8") as f:
+        db = JSONKeywordDB.model_validate(json.load(f))
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+        count_tokens = lambda text: len(encoding.encode(text))
+    except Exception as e:  # Encodage non téléchargeable hors-ligne
+        print(f"Tokenizer indisponible ({type(e).__name__}), approximation à 4 caractères par token.")
+        count_tokens = approx_tokens
+
+    embedder = EMBEDDERS[args.embedder]() if args.embedder else None
+    compacted, report = compact(db, args.threshold, embedder, args.embedding_threshold, count_tokens)
+
+    for cluster in report.clusters:
+        print(f"{cluster.canonical} ({cluster.documents} documents) <= {', '.join(cluster.aliases)}")
+    print(
+        f"{report.keywords_before} -> {report.keywords_after} mots clés, "
+        f"prompt de sélection : {report.prompt_tokens_before} -> {report.prompt_tokens_after} tokens "
+        f"({report.saved_tokens} économisés par tour)"
+    )
+    if args.output:
+        pathlib.Path(args.output).write_text(compacted.model_dump_json(), encoding="utf-8")
+        print(f"Index compacté -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Calcule une fois les embeddings des documents d'un index (par exemple data/index/db_1.json)
+et les enregistre à côté (db_1.embeddings.npz) pour la recherche vectorielle.
+
+    python -m loaders.embed_index data/index/db_1.json --embedder openai
+"""
+
+from typing import Dict
+import argparse, json, pathlib, dotenv
+
+from inferers.json_db import JSONKeywordDB
+from inferers.vector_db import BaseEmbedder, HashEmbedder, OpenAIEmbedder, VectorDB
+
+EMBEDDERS: Dict[str, type[BaseEmbedder]] = {
+    "openai": OpenAIEmbedder,
+    "hash": HashEmbedder,
+}
+
+
+def embeddings_path(index_path: str | pathlib.Path) -> pathlib.Path:
+    """data/index/db_1.json => data/index/db_1.embeddings.npz"""
+    index_path = pathlib.Path(index_path)
+    return index_path.with_name(index_path.stem + ".embeddings.npz")
+
+
+def embed_index(index_path: str | pathlib.Path, embedder: BaseEmbedder) -> VectorDB:
+    with open(index_path, "r", encoding="utf-8") as f:
+        db = JSONKeywordDB.model_validate(json.load(f))
+    vector_db = VectorDB.build(list(db.documents.keys()), embedder)
+    vector_db.save(str(embeddings_path(index_path)))
+    return vector_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calcul des embeddings d'un index JSONKeywordDB")
+    parser.add_argument("index", help="Chemin de l'index JSON (ex: data/index/db_1.json)")
+    parser.add_argument("--embedder", choices=EMBEDDERS.keys(), default="openai")
+    args = parser.parse_args()
+
+    dotenv.load_dotenv()
+    vector_db = embed_index(args.index, EMBEDDERS[args.embedder]())
+    print(f"{len(vector_db.documents)} documents encodés ({vector_db.embedder.name}) -> {embeddings_path(args.index)}")
+
+
+if __name__ == "__main__":
+    main()
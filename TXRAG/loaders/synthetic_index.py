@@ -0,0 +1,197 @@
+"""
+Génère hors-ligne, de façon déterministe (gabarits + graine), un index synthétique au format JSONKeywordDB
+et les questions associées au format de truth.json, pour mesurer le passage à l'échelle des retrievers
+(latence, mémoire, rappel) au-delà de la douzaine de documents de l'index actuel.
+
+    python -m loaders.synthetic_index data/index/synth_100k.json --documents 100000 --keywords 2000
+
+écrit synth_100k.json (index), synth_100k.truth.json ({question: [réponses attendues]})
+et synth_100k.queries.json ({question: [mots clés attendus]}, sélection oracle sans LLM).
+"""
+
+from typing import Dict, List, Set, Tuple
+import argparse, itertools, json, pathlib, random, pydantic
+
+# =================================================================== TEMPLATES
+
+SUBJECTS: List[Tuple[str, str]] = [
+    ("wifi", "le wifi"), ("eduroam", "eduroam"), ("vpn", "le VPN"), ("messagerie", "la messagerie"),
+    ("imprimante", "l'imprimante"), ("telephone", "le téléphone"), ("mot-de-passe", "le mot de passe"),
+    ("ent", "l'ENT"), ("moodle", "Moodle"), ("lecteur-reseau", "le lecteur réseau"), ("visio", "la visioconférence"),
+    ("poste-de-travail", "le poste de travail"), ("compte", "le compte informatique"), ("antivirus", "l'antivirus"),
+    ("sauvegarde", "la sauvegarde"), ("partage", "le partage de fichiers"),
+]
+PROBLEMS: List[Tuple[str, str]] = [
+    ("inaccessible", "inaccessible"), ("lent", "lent"), ("bloque", "bloqué"), ("erreur", "en erreur"),
+    ("deconnecte", "déconnecté"), ("expire", "expiré"), ("introuvable", "introuvable"),
+    ("configuration", "à configurer"), ("installation", "à installer"), ("droits", "sans droits d'accès"),
+]
+CONTEXTS: List[Tuple[str, str]] = [
+    ("", ""), ("cr", "au Centre de Recherche"), ("bf", "à Benjamin Franklin"), ("pg", "à Pierre Guillaumat"),
+    ("etudiant", "pour un étudiant"), ("personnel", "pour un personnel"), ("invite", "pour un invité"),
+    ("mac", "sous macOS"), ("linux", "sous Linux"), ("windows", "sous Windows"), ("android", "sous Android"),
+    ("ios", "sous iOS"),
+]
+ACTIONS = [
+    "redémarrez l'appareil puis reconnectez-vous",
+    "videz le cache du navigateur puis réessayez",
+    "réinitialisez le mot de passe sur le portail de l'ENT",
+    "supprimez le profil enregistré puis recréez-le",
+    "vérifiez le câble réseau et la prise murale",
+    "installez le certificat de l'université",
+    "demandez l'ouverture des droits au correspondant informatique",
+    "mettez à jour le système puis relancez l'application",
+]
+FILLERS = [
+    "Cette procédure s'applique à tous les sites de l'université.",
+    "Si le problème persiste, ouvrez un ticket auprès du support.",
+    "Le service informatique est joignable du lundi au vendredi.",
+    "Pensez à noter le message d'erreur exact affiché.",
+    "Les identifiants sont ceux de l'ENT.",
+    "Une coupure planifiée peut expliquer ce comportement.",
+]
+OPENERS = ["J'ai un problème :", "Bonjour,", "Depuis ce matin,", "Au secours,", "Question :", "Petit souci,"]
+
+
+def make_vocabulary(size: int) -> Dict[str, str]:
+    """`size` mots clés au format de l'index (slug => description), combinaisons sujet / problème / contexte."""
+    combinations = list(itertools.product(CONTEXTS, SUBJECTS, PROBLEMS))
+    vocabulary: Dict[str, str] = {}
+    for n in range(size):
+        (context, context_text), (subject, subject_text), (problem, problem_text) = combinations[n % len(combinations)]
+        variant = n // len(combinations) + 1  # Au-delà des combinaisons, variantes numérotées
+        slug = "-".join(part for part in (subject, problem, context) if part)
+        description = " ".join(part for part in (subject_text, problem_text, context_text) if part)
+        if variant > 1:
+            slug, description = f"{slug}-{variant}", f"{description} (cas {variant})"
+        vocabulary[slug] = description
+    return vocabulary
+
+
+# =================================================================== CORPUS
+
+
+class SyntheticCorpus(pydantic.BaseModel):
+    keywords: Dict[str, str] = pydantic.Field(..., description="Index : mot clé => description.")
+    documents: Dict[str, List[str]] = pydantic.Field(..., description="Index : document => mots clés.")
+    truth: Dict[str, List[str]] = pydantic.Field(..., description="Format truth.json : question => réponses attendues.")
+    queries: Dict[str, List[str]] = pydantic.Field(..., description="Question => mots clés attendus (sélection oracle).")
+
+    def index(self) -> Dict[str, Dict]:
+        """Index compatible JSONKeywordDB (JSONKeywordDB(**corpus.index()))."""
+        return {"keywords": self.keywords, "documents": self.documents}
+
+    def save(self, path: str | pathlib.Path):
+        path = pathlib.Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        for target, content in ((path, self.index()), (truth_path(path), self.truth), (queries_path(path), self.queries)):
+            with open(target, "w", encoding="utf-8") as f:
+                json.dump(content, f, ensure_ascii=False, indent=1)
+
+
+def truth_path(index_path: str | pathlib.Path) -> pathlib.Path:
+    """data/index/synth.json => data/index/synth.truth.json"""
+    index_path = pathlib.Path(index_path)
+    return index_path.with_name(index_path.stem + ".truth.json")
+
+
+def queries_path(index_path: str | pathlib.Path) -> pathlib.Path:
+    index_path = pathlib.Path(index_path)
+    return index_path.with_name(index_path.stem + ".queries.json")
+
+
+def _fact(i: int, descriptions: List[str], rng: random.Random) -> str:
+    """Réponse propre à un document (référence de fiche unique) : c'est elle que les questions attendent."""
+    return f"Pour {descriptions[0]} (fiche KB-{i:06d}), {rng.choice(ACTIONS)}."
+
+
+def generate(
+    n_documents: int,
+    n_keywords: int = 200,
+    keywords_per_document: int = 3,
+    n_queries: int = 50,
+    query_keywords: int = 2,
+    zipf: float = 1.0,
+    max_relevant: int = 5,
+    seed: int = 0,
+) -> SyntheticCorpus:
+    """
+    Index de `n_documents` fiches, chacune portant `keywords_per_document` mots clés tirés selon une loi de Zipf
+    d'exposant `zipf` (quelques mots clés très fréquents, beaucoup de rares, 0 = uniforme).
+    Chaque question porte sur `query_keywords` mots clés d'une fiche ; ses réponses attendues sont celles
+    de toutes les fiches portant ces mots clés. Les combinaisons trop courantes (plus de `max_relevant` fiches)
+    ne donnent pas de question, comme une vraie question qui appelle une réponse précise.
+    """
+    rng = random.Random(seed)
+    keywords = make_vocabulary(n_keywords)
+    slugs = list(keywords)
+    if keywords_per_document > len(slugs) or query_keywords > keywords_per_document:
+        raise ValueError("Il faut query_keywords <= keywords_per_document <= n_keywords.")
+    cumulative = list(itertools.accumulate(1 / (rank + 1) ** zipf for rank in range(len(slugs))))
+
+    documents: Dict[str, List[str]] = {}
+    facts: List[str] = []
+    for i in range(n_documents):
+        chosen: List[str] = []
+        while len(chosen) < keywords_per_document:
+            for slug in rng.choices(slugs, cum_weights=cumulative, k=keywords_per_document - len(chosen)):
+                if slug not in chosen:
+                    chosen.append(slug)
+        descriptions = [keywords[slug] for slug in chosen]
+        facts.append(_fact(i, descriptions, rng))
+        text = " ".join(
+            [f"Fiche KB-{i:06d} : {', '.join(descriptions)}.", facts[-1]] + rng.sample(FILLERS, k=2)
+        )
+        documents[text] = chosen
+
+    # Index inversé mot clé => fiches, pour calculer les réponses attendues de chaque question
+    postings: Dict[str, Set[int]] = {slug: set() for slug in slugs}
+    for i, doc_keywords in enumerate(documents.values()):
+        for slug in doc_keywords:
+            postings[slug].add(i)
+    doc_keywords_list = list(documents.values())
+
+    truth: Dict[str, List[str]] = {}
+    queries: Dict[str, List[str]] = {}
+    targets = list(range(n_documents))
+    rng.shuffle(targets)
+    for target in targets:
+        if len(truth) >= n_queries:
+            break
+        selected = rng.sample(doc_keywords_list[target], k=query_keywords)
+        relevant = sorted(set.intersection(*(postings[slug] for slug in selected)))
+        question = f"{rng.choice(OPENERS)} " + " et ".join(keywords[slug] for slug in selected) + " ?"
+        if len(relevant) > max_relevant or question in truth:
+            continue
+        truth[question] = [facts[i] for i in relevant]
+        queries[question] = selected
+
+    return SyntheticCorpus(keywords=keywords, documents=documents, truth=truth, queries=queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index JSONKeywordDB et questions synthétiques (hors-ligne, déterministe)")
+    parser.add_argument("index", help="Chemin de l'index JSON à écrire (ex: data/index/synth_10k.json)")
+    parser.add_argument("--documents", type=int, default=10_000)
+    parser.add_argument("--keywords", type=int, default=200, help="Taille du vocabulaire de mots clés")
+    parser.add_argument("--keywords-per-document", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--query-keywords", type=int, default=2, help="Mots clés par question")
+    parser.add_argument("--zipf", type=float, default=1.0, help="Exposant de popularité des mots clés (0 = uniforme)")
+    parser.add_argument("--max-relevant", type=int, default=5, help="Fiches pertinentes max par question")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = generate(
+        args.documents, args.keywords, args.keywords_per_document, args.queries, args.query_keywords, args.zipf,
+        args.max_relevant, args.seed
+    )
+    corpus.save(args.index)
+    print(
+        f"{len(corpus.documents)} documents, {len(corpus.keywords)} mots clés -> {args.index}\n"
+        f"{len(corpus.truth)} questions -> {truth_path(args.index)}, {queries_path(args.index)}"
+    )
+
+
+if __name__ == "__main__":
+    main()